@@ -1,53 +1,176 @@
+import os
+import time
+
 import streamlit as st
-import pandas as pd
-import zipfile
-import urllib.request
-from io import BytesIO
 
+from dataset_registry import acquire, release
+from dataset_store import append_export, list_schemas, load_store, read_catalog, select_partitions, store_fingerprint
+from downloader import download_zip
+from ingest_jobs import cancel_ingest, get_job, job_frame, start_ingest
+from outofcore import get_spill, open_spill
+from profiler import begin_run, finish_run, stage
+from dashboard_panels import download_progress, session_digest
+from table_view import ingest_status, performance_panel, registry_panel
 from dashboard_tier import run_tier_dashboard
 from dashboard_sosmed import run_sosmed_dashboard
+from dashboard_outofcore import run_outofcore_dashboard
 
 # HARUS di paling atas, hanya sekali
 st.set_page_config(layout="wide")
 st.title("📰 Topic Summary NoLimit Dashboard")
 
-@st.cache_data(show_spinner=False)
-def extract_csv_from_zip(zip_file):
-    with zipfile.ZipFile(zip_file, 'r') as zip_ref:
-        csv_files = [f for f in zip_ref.namelist() if f.endswith('.csv')]
-        dfs = []
-        for f in csv_files:
-            with zip_ref.open(f) as file:
-                df = pd.read_csv(file, delimiter=';', quotechar='"', on_bad_lines='skip', engine='python')
-                dfs.append(df)
-        return pd.concat(dfs, ignore_index=True) if dfs else pd.DataFrame()
+perf_panel = st.sidebar.checkbox("⏱️ Performance", key='perf_panel', help="Waktu, baris dan memori tiap tahap per rerun")
+begin_run(perf_panel, app='app')
+
+def open_store(schema, partition_ids):
+    # Gabungan partisi dibagi ke semua sesi lewat registry, bukan disalin per sesi seperti st.cache_data
+    partitions = select_partitions(read_catalog(schema), ids=partition_ids)
+    df = acquire(store_fingerprint(partitions), lambda: load_store(schema, list(partition_ids))[0],
+                 name=f"store {schema} · {len(partitions)} partisi")
+    return df, partitions
+
+def spill_progress(bar):
+    def report(done, total, rows):
+        bar.progress(done / max(total, 1), text=f"🧊 {done}/{total} file CSV · {rows} baris ditulis ke spill")
+    return report
 
 st.markdown("### 📁 Pilih sumber data ZIP")
 
-input_type = st.radio("Input ZIP via:", ["Upload File", "Link Download"])
+input_type = st.radio("Input ZIP via:", ["Upload File", "Link Download", "Dataset Store"])
 zip_data = None
+zip_source = None
+store_selection = None
+df = None
+spill = None
+outofcore_mode = False
 
 if input_type == "Upload File":
     uploaded = st.file_uploader("Unggah file ZIP", type="zip")
     if uploaded:
         zip_data = uploaded
+        zip_source = uploaded.name
+elif input_type == "Dataset Store":
+    schemas = list_schemas()
+    if not schemas:
+        st.info("📚 Dataset store masih kosong. Centang \"Simpan ke dataset store\" saat memuat ZIP untuk menambah partisi.")
+    else:
+        store_schema = st.selectbox("Jenis data", schemas)
+        partition_labels = {p['id']: f"{p['ingest_date']} · {p['source']} ({p['rows']} baris)" for p in read_catalog(store_schema)}
+        store_ids = st.multiselect("Partisi", list(partition_labels), default=list(partition_labels), format_func=partition_labels.get)
+        if store_ids:
+            store_selection = (store_schema, tuple(store_ids))
 else:
     zip_url = st.text_input("Masukkan URL file ZIP")
+    zip_source = zip_url
     if st.button("Download ZIP"):
         if zip_url:
             try:
-                response = urllib.request.urlopen(zip_url)
-                zip_data = BytesIO(response.read())
+                zip_data = download_zip(zip_url, progress=download_progress(st.progress(0.0, text="⬇️ Mengunduh ZIP...")))
             except Exception as e:
                 st.error(f"Gagal mengunduh ZIP: {e}")
 
-if zip_data:
-    with st.spinner("🔍 Mengekstrak dan membaca file..."):
-        df = extract_csv_from_zip(zip_data)
-        if df is None or df.empty:
-            st.error("❌ Tidak ada data terbaca.")
+if input_type != "Dataset Store":
+    outofcore_mode = st.checkbox("🧊 Mode out-of-core", help="Untuk export yang lebih besar dari RAM: ZIP dibaca per potongan ke spill Parquet di disk, hanya agregat yang disimpan di memori")
+    save_to_store = st.checkbox("📚 Simpan ke dataset store", disabled=outofcore_mode, help="ZIP ditambahkan sebagai partisi baru; baris dengan URL yang sudah ada di store dibuang")
+
+if outofcore_mode:
+    # Tanpa job background: spill ditulis sekali per digest lalu dipakai ulang oleh semua sesi
+    if st.session_state.get('ingest_digest'):
+        cancel_ingest(st.session_state.pop('ingest_digest'))
+        release()
+    if zip_data:
+        digest = session_digest(zip_data)
+        spill = get_spill(digest)
+        if spill is None:
+            bar = st.progress(0.0, text="🧊 Menyiapkan spill...")
+            try:
+                with stage('spill') as record:
+                    spill = open_spill(digest, zip_data, progress=spill_progress(bar))
+                    record.update(rows_out=spill['stats']['rows'])
+            except Exception as e:
+                st.error(f"❌ Gagal membaca ZIP: {e}")
+            bar.empty()
+        st.session_state['spill_digest'] = digest
+    elif input_type == "Link Download":
+        spill = get_spill(st.session_state.get('spill_digest'))
+    if spill is not None:
+        for member, error in spill['stats']['errors']:
+            st.warning(f"Gagal membaca {member}: {error}")
+
+# Ingest jalan di background per digest; sesi hanya mengingat digest ZIP yang sedang dilihat
+if zip_data and not outofcore_mode:
+    digest = session_digest(zip_data)
+    previous = st.session_state.get('ingest_digest')
+    if previous and previous != digest:
+        cancel_ingest(previous)
+        release()
+    st.session_state['ingest_digest'] = digest
+    # File upload ikut terkirim di tiap rerun; yang sudah dibatalkan baru diulang kalau diunduh lagi
+    if input_type == "Link Download" or st.session_state.get('ingest_cancelled') != digest:
+        st.session_state.pop('ingest_cancelled', None)
+        with st.spinner("🔍 Menyiapkan ZIP..."):
+            start_ingest(digest, zip_data)
+elif input_type == "Upload File" and st.session_state.get('ingest_digest'):
+    cancel_ingest(st.session_state.pop('ingest_digest'))
+    release()
+
+job = None
+if input_type != "Dataset Store" and st.session_state.get('ingest_digest'):
+    job = get_job(st.session_state['ingest_digest'])
+
+if job is not None:
+    progress = ingest_status(job)
+    if progress['status'] in ('running', 'done'):
+        with stage('load_zip') as record:
+            df, stats = job_frame(job)
+            record.update(rows_out=len(df), cache=stats['cache'])
+        for member, error in stats['errors']:
+            st.warning(f"Gagal membaca {member}: {error}")
+        if df.empty:
+            if job['status'] == 'done':
+                st.error("❌ Tidak ada data terbaca.")
         else:
-            if 'tier' in df.columns:
-                run_tier_dashboard(df)
-            else:
-                run_sosmed_dashboard(df)
+            cache_badge = {'hit': "⚡ cache hit", 'miss': "🐢 cache miss"}.get(stats['cache'], "⏳ ringkasan sementara")
+            st.caption(f"📄 {stats['parsed']}/{stats['members']} file CSV · {stats['rows']} baris · {stats['skipped_lines']} baris rusak dilewati · {cache_badge}")
+            if save_to_store and progress['status'] == 'done':
+                # Append sekali per ZIP per sesi; rerun berikutnya hanya menampilkan hasil yang tersimpan
+                partition = st.session_state.get('store_appended', {}).get(job['digest'])
+                if partition is None:
+                    try:
+                        with stage('store_append'):
+                            partition = append_export(zip_data if zip_data is not None else job['zip_file'],
+                                                      zip_source or os.path.basename(str(job['zip_file'])),
+                                                      digest=job['digest'])
+                    except (OSError, ValueError, RuntimeError) as e:
+                        st.warning(f"Gagal menyimpan ke dataset store: {e}")
+                    else:
+                        st.session_state.setdefault('store_appended', {})[job['digest']] = partition
+                if partition is not None:
+                    if partition['status'] == 'added':
+                        st.caption(f"📚 Partisi {partition['id']} ditambahkan · {partition['rows']} baris baru · {partition['duplicates']} duplikat URL dibuang")
+                    else:
+                        st.caption(f"📚 ZIP ini sudah ada di store sebagai partisi {partition['id']}")
+elif store_selection:
+    with st.spinner("📚 Membaca partisi dataset store..."):
+        with stage('load_store') as record:
+            df, partitions = open_store(*store_selection)
+            record.update(rows_out=len(df))
+    st.caption(f"📚 {len(partitions)} partisi · {len(df)} baris")
+
+if spill is not None:
+    run_outofcore_dashboard(spill)
+elif df is not None and not df.empty:
+    if 'tier' in df.columns:
+        run_tier_dashboard(df)
+    else:
+        run_sosmed_dashboard(df)
+
+report = finish_run()
+if perf_panel:
+    performance_panel(report)
+    registry_panel()
+
+if job is not None and job['status'] == 'running':
+    # Muat ulang berkala selama ingest berjalan supaya ringkasan ikut bertambah
+    time.sleep(1)
+    st.rerun()
@@ -0,0 +1,141 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from downloader import download_zip
+from engine import SCHEMAS, detect_schema, run_query
+from export_cache import load_or_parse, zip_digest
+from wordfreq import get_term_matrix, terms_by_sentiment, top_bigrams, top_terms
+
+FORMATS = ['parquet', 'csv', 'json']
+MANIFEST = 'manifest.json'
+
+
+def write_table(table, path, fmt):
+    if fmt == 'parquet':
+        table.to_parquet(path, index=False)
+    elif fmt == 'csv':
+        table.to_csv(path, index=False)
+    else:
+        table.to_json(path, orient='records', force_ascii=False)
+
+
+def filter_digest(filters, top_k):
+    key = {**filters, 'labels': sorted(filters['labels']), 'top_k': top_k}
+    return hashlib.blake2b(json.dumps(key, sort_keys=True).encode(), digest_size=4).hexdigest()
+
+
+def precompute(source, out_dir, fmt='parquet', sentiment='All', labels=(), label_mode='OR', query='',
+               cluster_threshold=None, top_k=500, max_workers=None, whole_words=False):
+    started = time.perf_counter()
+    zip_file = download_zip(source) if source.startswith(('http://', 'https://')) else source
+    digest = zip_digest(zip_file)
+    df, stats = load_or_parse(digest, zip_file, max_workers=max_workers)
+    if df.empty:
+        return {'source': source, 'digest': digest, 'error': 'tidak ada data CSV', 'stats': stats}
+
+    schema_name = detect_schema(df)
+    schema = SCHEMAS[schema_name]
+    result = run_query(df, sentiment, labels, label_mode, query, cluster_threshold, whole_words)
+    term_matrix = get_term_matrix(df, schema['text'], schema['sentiment'])
+    tables = {
+        'summary': result['summary'],
+        'terms': top_terms(term_matrix, result['mask'], top_k),
+        'bigrams': top_bigrams(term_matrix, result['mask'], top_k),
+        'terms_by_sentiment': terms_by_sentiment(term_matrix, result['mask'], top_k),
+    }
+
+    filters = {
+        'sentiment': sentiment,
+        'labels': list(labels),
+        'label_mode': label_mode,
+        'query': query,
+        'whole_words': whole_words,
+        'cluster_threshold': cluster_threshold,
+    }
+    # Satu folder per isi ZIP (digest) dan kombinasi filter, jadi filter berbeda tidak saling menimpa
+    # dan ZIP yang sama dengan filter sama tidak dihitung dua kali di folder berbeda
+    target = os.path.join(out_dir, f'{digest}-{filter_digest(filters, top_k)}')
+    os.makedirs(target, exist_ok=True)
+    files = {}
+    for name, table in tables.items():
+        files[name] = f'{name}.{fmt}'
+        write_table(table, os.path.join(target, files[name]), fmt)
+
+    manifest = {
+        'source': source,
+        'digest': digest,
+        'schema': schema_name,
+        'filters': filters,
+        'top_k': top_k,
+        'output': target,
+        'rows': result['rows'],
+        'topics': len(result['summary']),
+        'stats': {**stats, 'errors': [list(e) for e in stats['errors']]},
+        'files': files,
+        'seconds': round(time.perf_counter() - started, 3),
+    }
+    with open(os.path.join(target, MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest
+
+
+def _precompute_safe(source, options):
+    try:
+        return precompute(source, **options)
+    except Exception as e:
+        return {'source': source, 'error': str(e)}
+
+
+def run_batch(sources, out_dir, workers=None, **options):
+    # Banyak ZIP: paralel per arsip dan tiap arsip diparse satu proses; satu ZIP: paralel per CSV di dalamnya
+    workers = min(len(sources), workers or os.cpu_count() or 1)
+    if workers > 1:
+        options = {**options, 'out_dir': out_dir, 'max_workers': 1}
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(_precompute_safe, sources, [options] * len(sources)))
+    options = {**options, 'out_dir': out_dir}
+    return [_precompute_safe(source, options) for source in sources]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Hitung ringkasan topik NoLimit dari ZIP export tanpa Streamlit.")
+    parser.add_argument('zips', nargs='+', help="path atau URL ZIP export")
+    parser.add_argument('-o', '--out-dir', default='precomputed', help="folder hasil (default: precomputed)")
+    parser.add_argument('-f', '--format', choices=FORMATS, default='parquet', help="format tabel hasil")
+    parser.add_argument('--sentiment', default='All', help="filter sentimen, mis. negative (default: All)")
+    parser.add_argument('--label', action='append', default=[], dest='labels', help="filter label, bisa diulang")
+    parser.add_argument('--label-mode', choices=['OR', 'AND'], default='OR')
+    parser.add_argument('-q', '--query', default='', help="kata kunci, mis. 'harga \"beras murah\" -impor'")
+    parser.add_argument('--whole-words', action='store_true', help="cocokkan kata kunci sebagai kata utuh")
+    parser.add_argument('--cluster-threshold', type=float, default=None, help="gabungkan topik mirip di atas ambang ini")
+    parser.add_argument('--top-k', type=int, default=500, help="jumlah kata/frasa teratas")
+    parser.add_argument('-j', '--workers', type=int, default=None, help="jumlah proses (default: jumlah core)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    manifests = run_batch(
+        args.zips, args.out_dir, workers=args.workers, fmt=args.format,
+        sentiment=args.sentiment.lower() if args.sentiment != 'All' else 'All',
+        labels=tuple(args.labels), label_mode=args.label_mode, query=args.query,
+        whole_words=args.whole_words, cluster_threshold=args.cluster_threshold, top_k=args.top_k,
+    )
+    failed = 0
+    for manifest in manifests:
+        if 'error' in manifest:
+            failed += 1
+            print(f"GAGAL {manifest['source']}: {manifest['error']}", file=sys.stderr)
+        else:
+            print(f"{manifest['source']} -> {manifest['output']} "
+                  f"({manifest['schema']}, {manifest['rows']} baris, {manifest['topics']} topik, {manifest['seconds']} s)")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,270 @@
+import argparse
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+from engine import SCHEMAS, decorate
+from highlight import highlight_terms, highlight_text
+from ingest import list_csv_members, normalize_export, read_zip
+from label_index import build_label_index, label_counts, labels_mask
+from search import build_index, match_fields, parse_scoped_keywords, query_index
+from topics import summarize_topics
+from wordfreq import build_term_matrix, top_terms
+
+SIZES = {'10k': 10_000, '100k': 100_000, '1m': 1_000_000, '5m': 5_000_000}
+DATA_DIR = os.environ.get('NOLIMIT_BENCH_DIR', os.path.join(tempfile.gettempdir(), 'nolimit-bench'))
+CHUNK_ROWS = 250_000
+MEMBER_ROWS = 1_000_000
+MALFORMED_RATE = 0.001
+PAGE_SIZE = 50
+
+VOCAB = (
+    "ekonomi politik presiden harga beras naik turun jakarta banjir pemilu partai menteri rakyat subsidi bbm "
+    "listrik korupsi kpk sidang gubernur inflasi pajak impor ekspor petani nelayan sekolah guru rumah sakit "
+    "vaksin kesehatan jalan tol kereta bandara pelabuhan investasi saham rupiah dolar bank kredit utang "
+    "anggaran dpr mahkamah hakim jaksa polisi demo mahasiswa buruh upah pabrik tambang nikel batubara hutan "
+    "kebakaran gempa cuaca hujan musim panen pupuk pangan daging minyak goreng gula bansos desa kota"
+).split()
+LABELS = ['Ekonomi', 'Politik', 'Hukum', 'Sosial', 'Kesehatan', 'Pendidikan', 'Lingkungan', 'Infrastruktur']
+STAGES = ['extract', 'parse', 'normalize', 'label_filter', 'keyword_index', 'keyword_match', 'groupby', 'highlight', 'html', 'wordfreq']
+
+
+def parse_size(size):
+    return SIZES.get(size.lower()) or int(size)
+
+
+def _sentences(rng, n, low, high):
+    lengths = rng.integers(low, high + 1, n)
+    words = np.asarray(VOCAB, dtype=object)[rng.integers(0, len(VOCAB), lengths.sum())].tolist()
+    ends = np.cumsum(lengths).tolist()
+    return np.asarray([' '.join(words[end - length:end]) for end, length in zip(ends, lengths.tolist())], dtype=object)
+
+
+def _skewed(rng, pool, n):
+    # Distribusi Zipf: sedikit topik muncul sangat sering, sisanya ekor panjang
+    return pool[(rng.zipf(1.3, n) - 1) % len(pool)]
+
+
+def _label_pool(rng, sep, n=300):
+    counts = rng.choice([0, 1, 2, 3], n, p=[0.2, 0.45, 0.25, 0.1])
+    return np.asarray([sep.join(rng.choice(LABELS, k, replace=False)) for k in counts], dtype=object)
+
+
+def synthetic_frame(schema, rows, rng, start=0):
+    ids = np.arange(start, start + rows)
+    if schema == 'tier':
+        titles = _sentences(rng, max(10, rows // 8), 4, 10)
+        bodies = _sentences(rng, min(rows, 20_000), 40, 80)
+        body = bodies[rng.integers(0, len(bodies), rows)]
+        # Sebagian body berisi baris baru di dalam kutip dan sebagian judul/url dibungkus kutip tunggal
+        body = np.where(rng.random(rows) < 0.05, body + '\nbaca juga', body)
+        title = _skewed(rng, titles, rows)
+        title = np.where(rng.random(rows) < 0.3, "'" + title + "'", title)
+        url = pd.Series(ids).map('https://news.example/{}'.format).to_numpy(dtype=object)
+        url = np.where(rng.random(rows) < 0.3, "'" + url + "'", url)
+        url = np.where(rng.random(rows) < 0.01, None, url)
+        return pd.DataFrame({
+            'id': ids,
+            'title': title,
+            'body': body,
+            'url': url,
+            'sentiment': rng.choice(['positive', 'Positive', 'neutral', 'negative'], rows, p=[0.2, 0.05, 0.45, 0.3]),
+            'label': _skewed(rng, _label_pool(rng, ', '), rows),
+            'tier': rng.choice(['Tier 1', 'Tier 2', 'Tier 3', '-', '', None], rows, p=[0.2, 0.3, 0.3, 0.1, 0.05, 0.05]),
+            'media': rng.choice(['kompas', 'detik', 'tempo', 'antara'], rows),
+        })
+    contents = _sentences(rng, max(10, rows // 3), 6, 25)
+    content = _skewed(rng, contents, rows)
+    # Repost: teks sama dengan URL atau hashtag tambahan di akhir
+    suffix = rng.random(rows)
+    content = np.where(suffix < 0.2, content + ' https://t.co/' + ids.astype(str).astype(object), content)
+    content = np.where((suffix >= 0.2) & (suffix < 0.3), content + ' #viral', content)
+    return pd.DataFrame({
+        'id': ids,
+        'content': content,
+        'final_sentiment': rng.choice(['positive', 'neutral', 'negative'], rows, p=[0.25, 0.45, 0.3]),
+        'label': _skewed(rng, _label_pool(rng, ','), rows),
+        'url': pd.Series(ids).map('https://social.example/status/{}'.format).to_numpy(dtype=object),
+        'post_type': rng.choice(['tweet', 'retweet', 'reply', 'post', None], rows, p=[0.4, 0.3, 0.15, 0.1, 0.05]),
+        'object_group': rng.choice(['kementerian', 'partai', 'tokoh', None], rows, p=[0.4, 0.3, 0.2, 0.1]),
+        'specific_resource': rng.choice(['twitter', 'facebook', 'instagram', 'tiktok'], rows),
+    })
+
+
+def make_export(path, schema, rows, seed=1):
+    rng = np.random.default_rng(seed)
+    written = 0
+    malformed = 0
+    with zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=1) as zf:
+        for member, member_start in enumerate(range(0, rows, MEMBER_ROWS)):
+            member_rows = min(MEMBER_ROWS, rows - member_start)
+            with zf.open(f'{schema}_{member + 1}.csv', 'w', force_zip64=True) as raw:
+                out = io.TextIOWrapper(raw, encoding='utf-8', newline='')
+                for chunk_start in range(0, member_rows, CHUNK_ROWS):
+                    n = min(CHUNK_ROWS, member_rows - chunk_start)
+                    frame = synthetic_frame(schema, n, rng, written)
+                    frame.to_csv(out, sep=';', quotechar='"', index=False, header=chunk_start == 0, lineterminator='\n')
+                    # Baris rusak: jumlah kolom lebih banyak dari header
+                    bad = max(1, int(n * MALFORMED_RATE))
+                    out.write(''.join(';'.join(['x'] * (frame.shape[1] + 3)) + '\n' for _ in range(bad)))
+                    written += n
+                    malformed += bad
+                out.flush()
+                out.detach()
+    return {'path': path, 'rows': written, 'malformed': malformed, 'bytes': os.path.getsize(path)}
+
+
+def dataset(schema, rows, seed=1, data_dir=DATA_DIR):
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f'{schema}-{rows}-s{seed}.zip')
+    if not os.path.exists(path):
+        make_export(path + '.tmp', schema, rows, seed)
+        os.replace(path + '.tmp', path)
+    return path
+
+
+def _timed(timings, stage, fn):
+    started = time.perf_counter()
+    out = fn()
+    timings[stage] = round(time.perf_counter() - started, 4)
+    return out
+
+
+def _extract(path):
+    total = 0
+    with zipfile.ZipFile(path) as zf:
+        for member in list_csv_members(path):
+            with zf.open(member) as f:
+                while chunk := f.read(1024 * 1024):
+                    total += len(chunk)
+    return total
+
+
+def bench_export(path, schema_name):
+    # Tiap tahap dipanggil langsung (tanpa cache dataset_artifact) supaya waktunya berdiri sendiri
+    schema = SCHEMAS[schema_name]
+    key, sentiment_col = schema['key'], schema['sentiment']
+    timings = {}
+    _timed(timings, 'extract', lambda: _extract(path))
+    df, stats = _timed(timings, 'parse', lambda: read_zip(path))
+    df = _timed(timings, 'normalize', lambda: normalize_export(df))
+
+    def label_filter():
+        index = build_label_index(df['label'])
+        return labels_mask(index, list(label_counts(index).index[:2]))
+    mask = _timed(timings, 'label_filter', label_filter)
+
+    query = 'harga beras -impor "minyak goreng"'
+
+    # Indeks dibangun sekali per dataset, query dijalankan tiap rerun; keduanya diukur terpisah
+    indexes = _timed(timings, 'keyword_index', lambda: {f: build_index(df[f]) for f in schema['text']})
+
+    def keyword_match():
+        clauses = parse_scoped_keywords(query, schema['text'])
+        return match_fields(schema['text'], clauses, lambda f, c, b: query_index(indexes[f], *c, base=b), mask)
+    _timed(timings, 'keyword_match', keyword_match)
+
+    columns = [c for c in (key, sentiment_col, 'url', schema['tier']) if c]
+    summary = _timed(timings, 'groupby', lambda: summarize_topics(df.loc[mask, columns], key, sentiment_col, tier_col=schema['tier']))
+
+    terms = highlight_terms('harga beras minyak')
+    highlight_text.cache_clear()
+    _timed(timings, 'highlight', lambda: [highlight_text(str(text), terms) for text in summary[key]])
+    highlight_text.cache_clear()
+    _timed(timings, 'html', lambda: decorate(summary.head(PAGE_SIZE), key, 'harga beras minyak').to_html(escape=False, index=False))
+
+    def wordfreq():
+        texts = df[schema['text'][0]].astype(str)
+        for column in schema['text'][1:]:
+            texts = texts + ' ' + df[column].astype(str)
+        return top_terms(build_term_matrix(texts, df[sentiment_col]), mask)
+    _timed(timings, 'wordfreq', wordfreq)
+
+    timings['total'] = round(sum(timings[s] for s in STAGES), 4)
+    return {
+        'rows': stats['rows'],
+        'skipped_lines': stats['skipped_lines'],
+        'topics': len(summary),
+        'memory_mb': round(df.memory_usage(deep=True).sum() / 1024 ** 2, 1),
+        'stages': timings,
+    }
+
+
+def run_benchmarks(schemas, sizes, seed=1, repeat=1, data_dir=DATA_DIR):
+    results = []
+    for schema in schemas:
+        for rows in sizes:
+            path = dataset(schema, rows, seed, data_dir)
+            runs = [bench_export(path, schema) for _ in range(repeat)]
+            # Ambil waktu terbaik per tahap dari beberapa ulangan
+            best = {stage: min(run['stages'][stage] for run in runs) for stage in runs[0]['stages']}
+            results.append({'schema': schema, 'size': rows, 'zip_bytes': os.path.getsize(path), **runs[0], 'stages': best})
+            print(f"{schema:>6} {rows:>9} rows  " + '  '.join(f"{s}={best[s]:.3f}" for s in STAGES + ['total']), file=sys.stderr)
+    return {
+        'meta': {
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'seed': seed,
+            'repeat': repeat,
+        },
+        'results': results,
+    }
+
+
+def compare(report, baseline, tolerance=0.2):
+    # Bandingkan per (schema, size, tahap); lebih lambat dari toleransi dihitung regresi
+    previous = {(r['schema'], r['size']): r['stages'] for r in baseline['results']}
+    regressions = []
+    for result in report['results']:
+        old = previous.get((result['schema'], result['size']))
+        if not old:
+            continue
+        for stage, seconds in result['stages'].items():
+            if old.get(stage) and seconds > old[stage] * (1 + tolerance) and seconds - old[stage] > 0.01:
+                regressions.append({'schema': result['schema'], 'size': result['size'], 'stage': stage,
+                                    'baseline': old[stage], 'current': seconds, 'ratio': round(seconds / old[stage], 2)})
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark tiap tahap pipeline NoLimit dengan data sintetis.")
+    parser.add_argument('--schemas', default='tier,sosmed', help="tier,sosmed")
+    parser.add_argument('--sizes', default='10k,100k', help="mis. 10k,100k,1m,5m atau angka baris")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=1, help="ulangan per dataset, diambil yang tercepat")
+    parser.add_argument('--data-dir', default=DATA_DIR, help="folder ZIP sintetis (dipakai ulang)")
+    parser.add_argument('-o', '--out', default='bench_report.json', help="file laporan JSON")
+    parser.add_argument('--compare', help="laporan JSON sebelumnya sebagai baseline")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="batas perlambatan relatif sebelum dianggap regresi")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = run_benchmarks(args.schemas.split(','), [parse_size(s) for s in args.sizes.split(',')],
+                           args.seed, args.repeat, args.data_dir)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            report['regressions'] = compare(report, json.load(f), args.tolerance)
+        for r in report['regressions']:
+            print(f"REGRESI {r['schema']} {r['size']} {r['stage']}: {r['baseline']:.3f}s -> {r['current']:.3f}s (x{r['ratio']})",
+                  file=sys.stderr)
+    with open(args.out, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    return 1 if report.get('regressions') else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
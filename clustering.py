@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+
+from ingest import dataset_artifact
+
+NUM_PERM = 64
+SEED = 1
+URL_PATTERN = r'https?://\S+|www\.\S+'
+TRAILING_HASHTAGS = r'(?:\s*#\w+)+\s*$'
+
+
+def normalize_texts(texts):
+    # Repost yang hanya beda URL, emoji, tanda baca atau hashtag di akhir dianggap teks yang sama
+    normalized = texts.astype(str).str.lower()
+    normalized = normalized.str.replace(URL_PATTERN, ' ', regex=True)
+    normalized = normalized.str.replace(TRAILING_HASHTAGS, ' ', regex=True)
+    return normalized.str.replace(r'[\W_]+', ' ', regex=True).str.strip()
+
+
+def shingle_hashes(normalized):
+    # Shingle = bigram kata; teks satu kata memakai kata itu sendiri
+    words = normalized.reset_index(drop=True).str.split().explode().dropna()
+    docs = words.index.to_numpy()
+    words = words.to_numpy(dtype=object)
+    same_doc = docs[1:] == docs[:-1]
+    bigrams = words[:-1][same_doc] + ' ' + words[1:][same_doc]
+    single = np.bincount(docs, minlength=len(normalized))[docs] == 1
+    shingle_docs = np.concatenate([docs[:-1][same_doc], docs[single]])
+    shingles = np.concatenate([bigrams, words[single]])
+    order = np.argsort(shingle_docs, kind='stable')
+    return shingle_docs[order], pd.util.hash_array(shingles[order])
+
+
+def minhash_signatures(shingle_docs, hashes, n_docs, num_perm=NUM_PERM):
+    rng = np.random.default_rng(SEED)
+    a = rng.integers(1, 2 ** 63, num_perm, dtype=np.uint64) | np.uint64(1)
+    b = rng.integers(0, 2 ** 63, num_perm, dtype=np.uint64)
+    signatures = np.full((n_docs, num_perm), np.iinfo(np.uint32).max, dtype=np.uint32)
+    has_shingles = np.zeros(n_docs, dtype=bool)
+    if not len(hashes):
+        return signatures, has_shingles
+    starts = np.flatnonzero(np.r_[True, shingle_docs[1:] != shingle_docs[:-1]])
+    docs = shingle_docs[starts]
+    has_shingles[docs] = True
+    for i in range(num_perm):
+        values = ((hashes * a[i] + b[i]) >> np.uint64(32)).astype(np.uint32)
+        signatures[docs, i] = np.minimum.reduceat(values, starts)
+    return signatures, has_shingles
+
+
+def band_params(threshold, num_perm=NUM_PERM):
+    # Ambang LSH (1/b)^(1/r) dipilih tepat di bawah ambang kemiripan; kandidat tetap diverifikasi
+    options = [(num_perm // r, r) for r in range(1, num_perm + 1) if num_perm % r == 0]
+    below = [(b, r) for b, r in options if (1 / b) ** (1 / r) <= threshold]
+    return max(below, key=lambda br: br[1]) if below else options[0]
+
+
+def lsh_candidates(signatures, has_shingles, bands, rows):
+    docs = np.flatnonzero(has_shingles)
+    multipliers = np.random.default_rng(SEED + 1).integers(1, 2 ** 63, rows, dtype=np.uint64) | np.uint64(1)
+    pairs = [np.empty((0, 2), dtype=np.int64)]
+    for band in range(bands):
+        block = signatures[docs, band * rows:(band + 1) * rows].astype(np.uint64)
+        keys = (block * multipliers).sum(axis=1)
+        order = np.argsort(keys, kind='stable')
+        same = keys[order][1:] == keys[order][:-1]
+        pairs.append(np.stack([docs[order[:-1][same]], docs[order[1:][same]]], axis=1))
+    return np.unique(np.concatenate(pairs), axis=0)
+
+
+def connected_components(n, left, right):
+    labels = np.arange(n)
+    while True:
+        lowest = np.minimum(labels[left], labels[right])
+        updated = labels.copy()
+        np.minimum.at(updated, left, lowest)
+        np.minimum.at(updated, right, lowest)
+        updated = updated[updated]
+        if np.array_equal(updated, labels):
+            return labels
+        labels = updated
+
+
+def cluster_texts(texts, threshold=0.8, num_perm=NUM_PERM):
+    codes, uniques = pd.factorize(texts)
+    if not len(uniques):
+        return np.full(len(texts), None, dtype=object)
+    counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+    shingle_docs, hashes = shingle_hashes(normalize_texts(pd.Series(uniques, dtype=object)))
+    signatures, has_shingles = minhash_signatures(shingle_docs, hashes, len(uniques), num_perm)
+    pairs = lsh_candidates(signatures, has_shingles, *band_params(threshold, num_perm))
+    left, right = pairs[:, 0], pairs[:, 1]
+    similar = (signatures[left] == signatures[right]).mean(axis=1) >= threshold
+    labels = connected_components(len(uniques), left[similar], right[similar])
+
+    # Wakil cluster: teks persis yang paling sering muncul, seri diambil yang muncul duluan
+    order = np.lexsort((np.arange(len(uniques)), -counts, labels))
+    first = np.r_[True, labels[order][1:] != labels[order][:-1]]
+    representative = np.zeros(len(uniques), dtype=np.int64)
+    representative[labels[order][first]] = order[first]
+    row_text = np.asarray(uniques, dtype=object)[representative[labels]][codes]
+    row_text[codes < 0] = None
+    return row_text
+
+
+def get_topic_clusters(df, key, threshold):
+    return dataset_artifact(df, f'clusters:{key}:{threshold}', lambda d: cluster_texts(d[key], threshold))
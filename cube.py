@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+
+from engine import SCHEMAS, detect_schema
+from ingest import dataset_artifact
+from label_index import combos_matching, get_label_index
+from profiler import stage
+from search import parse_scoped_keywords, query_mask
+
+# Dimensi tambahan cube per jenis data, selain sentimen dan kombinasi label
+CUBE_FACETS = {'tier': ['tier'], 'sosmed': ['post_type', 'object_group']}
+
+
+def _dimension(values, lower=False):
+    # Kategori difaktorkan dari kodenya; nilai yang sama setelah lowercase digabung
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    labels = pd.Series(np.asarray(uniques, dtype=object)).fillna('').astype(str)
+    if lower:
+        labels = labels.str.lower()
+    merged, vocab = pd.factorize(labels, sort=True)
+    return merged[codes], list(vocab)
+
+
+def build_cube(df):
+    # Jumlah baris per sel sentimen × kombinasi label × facet; satu sel per kombinasi yang benar-benar muncul
+    schema_name = detect_schema(df)
+    schema = SCHEMAS[schema_name]
+    label_index = get_label_index(df)
+    dims = ['sentiment', 'combo'] + [c for c in CUBE_FACETS[schema_name] if c in df.columns]
+    sentiment_codes, sentiment_vocab = _dimension(df[schema['sentiment']], lower=True)
+    codes = {'sentiment': sentiment_codes, 'combo': label_index['codes']}
+    vocab = {'sentiment': sentiment_vocab, 'combo': label_index['combos']}
+    for dim in dims[2:]:
+        codes[dim], vocab[dim] = _dimension(df[dim])
+    shape = tuple(max(len(vocab[dim]), 1) for dim in dims)
+    keys = np.ravel_multi_index([codes[dim].astype(np.int64) for dim in dims], shape)
+    cell_keys, cells = np.unique(keys, return_inverse=True)
+    return {
+        'dims': dims,
+        'text': schema['text'],
+        'vocab': vocab,
+        'codes': dict(zip(dims, np.unravel_index(cell_keys, shape))),
+        'cells': cells.astype(np.int32),
+        'n': np.bincount(cells, minlength=len(cell_keys)).astype(np.int64),
+        'labels': label_index,
+    }
+
+
+def get_cube(df):
+    return dataset_artifact(df, 'cube', build_cube)
+
+
+def cube_weights(cube, df, query='', whole_words=False):
+    # Tanpa kata kunci cukup jumlah per sel; dengan kata kunci hanya baris yang cocok yang dihitung ulang per sel
+    if not any(any(c) for c in parse_scoped_keywords(query, cube['text']).values()):
+        return cube['n']
+    mask = query_mask(df, cube['text'], query, whole_words=whole_words)
+    return np.bincount(cube['cells'][mask], minlength=len(cube['n'])).astype(np.int64)
+
+
+def cell_mask(cube, sentiment='All', labels=(), label_mode='OR'):
+    mask = np.ones(len(cube['n']), dtype=bool)
+    if sentiment != 'All':
+        vocab = cube['vocab']['sentiment']
+        mask &= cube['codes']['sentiment'] == (vocab.index(sentiment) if sentiment in vocab else -1)
+    if labels:
+        mask &= combos_matching(cube['labels'], labels, match_all=label_mode == 'AND')[cube['codes']['combo']]
+    return mask
+
+
+def facet_counts(cube, dim, weights, mask=None):
+    if mask is not None:
+        weights = np.where(mask, weights, 0)
+    if dim == 'label':
+        index = cube['labels']
+        per_combo = np.bincount(cube['codes']['combo'], weights=weights, minlength=len(index['combos']))
+        return pd.Series(per_combo @ index['matrix'], index=index['vocab']).astype(np.int64)
+    vocab = cube['vocab'][dim]
+    counts = np.bincount(cube['codes'][dim], weights=weights, minlength=len(vocab))
+    return pd.Series(counts, index=vocab).astype(np.int64)
+
+
+def filter_stats(df, sentiment='All', labels=(), label_mode='OR', query='', whole_words=False):
+    # Statistik sidebar dan jumlah per opsi filter; tiap facet dihitung tanpa filternya sendiri
+    with stage('cube', len(df)) as record:
+        cube = get_cube(df)
+        weights = cube_weights(cube, df, query, whole_words)
+        by_labels = cell_mask(cube, labels=labels, label_mode=label_mode)
+        by_sentiment = cell_mask(cube, sentiment)
+        selected = by_labels & by_sentiment
+        stats = {
+            'rows': int(weights[selected].sum()),
+            'sentiment_options': facet_counts(cube, 'sentiment', weights, by_labels),
+            'label_options': facet_counts(cube, 'label', weights, by_sentiment),
+            'sentiments': facet_counts(cube, 'sentiment', weights, selected),
+        }
+        for dim in cube['dims'][2:]:
+            stats[dim] = facet_counts(cube, dim, weights, selected)
+        record['rows_out'] = stats['rows']
+    return stats
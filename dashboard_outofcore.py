@@ -0,0 +1,60 @@
+import streamlit as st
+
+from dashboard_panels import filter_sidebar, init_filter_state, stats_sidebar, wordcloud_panel, wordcloud_sidebar
+from engine import SCHEMAS, decorate
+from outofcore import query_spill, resolve_page, row_chunks, summary_chunks, top_counts, topic_summary
+from profiler import stage
+from table_view import download_panel, summary_page
+from topics import TIER_COLUMNS
+
+def run_outofcore_dashboard(spill):
+    schema = SCHEMAS[spill['schema']]
+    key = schema['key']
+    st.title("🧊 Topic Summary NoLimit (out-of-core)")
+    st.caption(f"📄 {spill['stats']['members']} file CSV · {spill['stats']['rows']} baris · {spill['stats']['skipped_lines']} baris rusak dilewati · data dibaca bertahap dari spill Parquet")
+
+    init_filter_state()
+
+    # Jumlah per opsi filter dari agregat spill (tanpa memperhitungkan filter lain)
+    totals = spill['aggregates']
+    sentiment_counts = totals['sentiments'].sort_index()
+    filters = filter_sidebar(spill['schema'], sentiment_counts, totals['labels'])
+    dynamic_terms = wordcloud_sidebar()
+
+    with stage('query', spill['stats']['rows']) as record:
+        with st.spinner("🧊 Membaca spill..."):
+            result = query_spill(spill, filters['sentiment'], filters['labels'], filters['label_mode'], filters['keyword'],
+                                 terms=dynamic_terms, whole_words=filters['whole_words'])
+        record.update(rows_out=result['rows'])
+
+    stats_sidebar(spill['schema'], result['rows'], result['sentiments'])
+
+    col1, col2 = st.columns([0.7, 0.3])
+    with col1:
+        st.markdown("### 📊 Ringkasan Topik")
+        with stage('summarize', len(result['topics'])):
+            summary = topic_summary(result, tier=bool(schema['tier']))
+        # Teks topik tidak ada di agregat, jadi urutan teks tidak tersedia
+        page = summary_page(summary, key, sort_options=['Article', 'Sentiment'])
+        with stage('fetch_rows', len(page)):
+            page = resolve_page(spill, page)
+        with stage('highlight', len(page)):
+            grouped = decorate(page, key, filters['highlight'])
+        columns = [key, 'Article'] + (TIER_COLUMNS if schema['tier'] else []) + ['Sentiment', 'Link']
+        st.markdown("<div style='overflow-x:auto;'>", unsafe_allow_html=True)
+        with stage('html', len(grouped)):
+            table_html = grouped[columns].to_html(escape=False, index=False)
+        st.write(table_html, unsafe_allow_html=True)
+        st.markdown("</div>", unsafe_allow_html=True)
+        # Teks dan URL diambil dari spill per potongan saat file dibuat
+        download_panel(('spill', spill['digest'], filters['sentiment'], tuple(sorted(filters['labels'])), filters['label_mode'], filters['keyword'], filters['whole_words']), {
+            'ringkasan': ("Ringkasan topik", columns, lambda: (chunk[columns] for chunk in summary_chunks(spill, summary))),
+            'baris': ("Baris data", spill['columns'], lambda: row_chunks(spill, filters['sentiment'], filters['labels'], filters['label_mode'], filters['keyword'], filters['whole_words'])),
+        })
+
+    with col2:
+        # Frekuensi kata sudah diagregasi saat spill ditulis; versi dinamis ikut hasil query
+        wordcloud_panel(spill['stats']['rows'], lambda dynamic: {
+            "Kata": top_counts((result if dynamic else totals)['terms'], ['Kata', 'Jumlah']),
+            "Frasa": top_counts((result if dynamic else totals)['bigrams'], ['Frasa', 'Jumlah']),
+        })
@@ -0,0 +1,146 @@
+import streamlit as st
+
+from export_cache import source_key, zip_digest
+from ingest import memory_report
+from profiler import stage
+from topics import TIER_COLUMNS
+from wordfreq import get_term_matrix, terms_by_sentiment, top_bigrams, top_terms
+
+# Teks sidebar yang beda per skema; kolom data ada di engine.SCHEMAS
+SCHEMA_TEXT = {
+    'tier': {
+        'total': "📰 Total Artikel",
+        'keyword_help': "\"frasa\" harus persis, (a OR b) salah satu, -kata dikecualikan; title:kata atau body:\"frasa\" hanya mencari di kolom itu",
+    },
+    'sosmed': {
+        'total': "💬 Total Percakapan",
+        'keyword_help': "\"frasa\" harus persis, (a OR b) salah satu, -kata dikecualikan",
+    },
+}
+
+
+def download_progress(bar):
+    def report(done, total):
+        if total:
+            bar.progress(min(done / total, 1.0), text=f"⬇️ {done / 1e6:.1f} / {total / 1e6:.1f} MB")
+        else:
+            bar.progress(0.0, text=f"⬇️ {done / 1e6:.1f} MB")
+    return report
+
+
+def session_digest(zip_data):
+    # Hash ZIP dihitung sekali per file, bukan di tiap rerun (termasuk polling ingest)
+    key = source_key(zip_data)
+    memo = st.session_state.get('zip_digest_memo')
+    if key is None or memo is None or memo[0] != key:
+        memo = (key, zip_digest(zip_data))
+        st.session_state['zip_digest_memo'] = memo
+    return memo[1]
+
+
+def _reset_filters():
+    st.session_state['sentiment_filter'] = "All"
+    st.session_state['label_filter'] = []
+    st.session_state['keyword_input'] = ""
+    st.session_state['highlight_words'] = ""
+
+
+def init_filter_state():
+    if 'show_wordcloud' not in st.session_state:
+        st.session_state['show_wordcloud'] = False
+    if 'dynamic_wordcloud' not in st.session_state:
+        st.session_state['dynamic_wordcloud'] = True
+    if 'sentiment_filter' not in st.session_state:
+        _reset_filters()
+    if st.sidebar.button("🔄 Clear Filter"):
+        _reset_filters()
+
+
+def filter_state():
+    # Nilai filter dibaca dari key widget sebelum widget digambar, untuk menghitung jumlah per opsi
+    return (st.session_state['sentiment_filter'], st.session_state['label_filter'],
+            st.session_state.get('label_mode', 'OR'), st.session_state['keyword_input'],
+            st.session_state.get('whole_words', False))
+
+
+def facet_caption(schema_name, stats):
+    # Rincian per tier untuk berita, per post_type untuk sosmed
+    if schema_name == 'tier':
+        return " · ".join(f"{tier}: {stats['tier'].get(tier, 0)}" for tier in TIER_COLUMNS)
+    if 'post_type' in stats:
+        post_types = stats['post_type'][stats['post_type'] > 0].sort_values(ascending=False)
+        return " · ".join(f"{name or '-'}: {n}" for name, n in post_types.items())
+    return None
+
+
+def stats_sidebar(schema_name, rows, sentiments, caption=None, df=None):
+    st.sidebar.markdown("### 📊 Statistik")
+    st.sidebar.markdown(f"<div style='font-size:18px; font-weight:bold;'>{SCHEMA_TEXT[schema_name]['total']}: {rows}</div>", unsafe_allow_html=True)
+    st.sidebar.markdown(f"""
+        <div style='margin-top:4px;'>
+            <span style='color:green;'>🟢 {sentiments.get('positive', 0)}</span> |
+            <span style='color:gray;'>⚪ {sentiments.get('neutral', 0)}</span> |
+            <span style='color:red;'>🔴 {sentiments.get('negative', 0)}</span>
+        </div>
+    """, unsafe_allow_html=True)
+    if caption:
+        st.sidebar.caption(caption)
+    if df is not None:
+        with st.sidebar.expander("💾 Memori dataset"):
+            st.dataframe(memory_report(df), hide_index=True, use_container_width=True)
+
+
+def filter_sidebar(schema_name, sentiment_counts, label_totals):
+    # sentiment_counts/label_totals: jumlah per opsi (Series); opsi yang hilang setelah filter lain berubah dibuang dari state
+    sentiment_options = ["All"] + list(sentiment_counts.index)
+    if st.session_state['sentiment_filter'] not in sentiment_options:
+        st.session_state['sentiment_filter'] = "All"
+    st.session_state['label_filter'] = [l for l in st.session_state['label_filter'] if l in label_totals.index]
+
+    sentiment = st.sidebar.selectbox("Sentimen", sentiment_options, key='sentiment_filter',
+                                     format_func=lambda s: s if s == "All" else f"{s} ({sentiment_counts[s]})")
+    labels = st.sidebar.multiselect("Label", options=list(label_totals.index), key='label_filter',
+                                    format_func=lambda l: f"{l} ({label_totals[l]})")
+    label_mode = st.sidebar.radio("Mode label", ["OR", "AND"], horizontal=True, key='label_mode', disabled=len(labels) < 2)
+
+    keyword = st.sidebar.text_input("Kata kunci (\"frasa\" -exclude)", key='keyword_input',
+                                    help=SCHEMA_TEXT[schema_name]['keyword_help'])
+    whole_words = st.sidebar.checkbox("Kata utuh", key='whole_words', help="Cocokkan kata utuh saja, mis. \"bank\" tidak cocok dengan \"bankir\"")
+
+    highlight = st.sidebar.text_input("Highlight Kata", value=st.session_state['highlight_words'])
+    st.session_state['highlight_words'] = highlight
+    return {'sentiment': sentiment, 'labels': labels, 'label_mode': label_mode, 'keyword': keyword,
+            'whole_words': whole_words, 'highlight': highlight}
+
+
+def cluster_sidebar():
+    merge_similar = st.sidebar.checkbox("Gabungkan topik mirip", value=False, help="Repost yang hanya beda URL, emoji atau hashtag dihitung satu topik")
+    return st.sidebar.slider("Ambang kemiripan", 0.5, 0.95, 0.8, 0.05) if merge_similar else None
+
+
+def wordcloud_sidebar():
+    st.session_state['show_wordcloud'] = st.sidebar.checkbox("Tampilkan WordCloud", value=st.session_state['show_wordcloud'])
+    if st.session_state['show_wordcloud']:
+        st.session_state['dynamic_wordcloud'] = st.sidebar.checkbox("Word Cloud Dinamis", value=st.session_state['dynamic_wordcloud'])
+    return st.session_state['show_wordcloud'] and st.session_state['dynamic_wordcloud']
+
+
+def term_tables(df, schema, mask):
+    term_matrix = get_term_matrix(df, schema['text'], schema['sentiment'])
+    return {
+        "Kata": top_terms(term_matrix, mask),
+        "Frasa": top_bigrams(term_matrix, mask),
+        "Per Sentimen": terms_by_sentiment(term_matrix, mask),
+    }
+
+
+def wordcloud_panel(rows, tables):
+    # tables(dinamis) -> {judul tab: frame}; hanya dihitung kalau WordCloud ditampilkan
+    if not st.session_state['show_wordcloud']:
+        return
+    st.markdown("### ☁️ Word Cloud (Top 500)")
+    with stage('wordfreq', rows):
+        frames = tables(st.session_state['dynamic_wordcloud'])
+    for tab, frame in zip(st.tabs(list(frames)), frames.values()):
+        with tab:
+            st.dataframe(frame, use_container_width=True)
@@ -0,0 +1,160 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+from ingest import artifact_bytes, drop_artifacts
+
+REGISTRY_MAX_BYTES = int(os.environ.get('NOLIMIT_REGISTRY_MAX_BYTES', 8 * 1024 ** 3))
+
+# Dataset hasil ingest per fingerprint, dipakai bersama semua sesi Streamlit dalam satu proses.
+# Frame diperlakukan read-only: dengan copy-on-write pandas, perubahan di satu sesi tidak mengenai sesi lain.
+_datasets = OrderedDict()
+_sessions = {}
+_loading = {}
+_lock = threading.Lock()
+
+
+def current_session():
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+    except ImportError:
+        return None
+    ctx = get_script_run_ctx(suppress_warning=True)
+    return ctx.session_id if ctx is not None else None
+
+
+def dataset_bytes(df):
+    return int(df.memory_usage(deep=True, index=True).sum())
+
+
+def _entry(df, name):
+    bounds = df.attrs.get('partitions') or []
+    return {
+        'df': df,
+        'name': name,
+        'bytes': dataset_bytes(df),
+        'sessions': set(),
+        'hits': 0,
+        'last_used': time.time(),
+        # Artefak partisi ikut dibuang saat dataset gabungannya keluar dari registry
+        'artifacts': [df.attrs.get('fingerprint')] + [digest for digest, _, _ in bounds],
+    }
+
+
+def _release(session):
+    # Dipanggil dengan _lock terpegang
+    key = _sessions.pop(session, None)
+    if key in _datasets:
+        _datasets[key]['sessions'].discard(session)
+
+
+def session_active(session):
+    # Di luar Streamlit semua sesi dianggap masih hidup
+    try:
+        from streamlit import runtime
+    except ImportError:
+        return True
+    if session is None or not runtime.exists():
+        return True
+    return runtime.get_instance().is_active_session(session)
+
+
+def _prune_sessions():
+    # Sesi browser yang sudah ditutup tidak lagi menahan dataset
+    for session in [s for s in _sessions if not session_active(s)]:
+        _release(session)
+
+
+def _entry_bytes(entry):
+    # Frame ditambah artefak turunannya (indeks token, matriks term, cube) yang saat ini masih di cache
+    return entry['bytes'] + artifact_bytes(entry['artifacts'])
+
+
+def _evict(keep, max_bytes):
+    # Dipanggil dengan _lock terpegang; yang tidak dipakai sesi mana pun dibuang lebih dulu, lalu yang paling lama
+    _prune_sessions()
+    sizes = {key: _entry_bytes(entry) for key, entry in _datasets.items()}
+    total = sum(sizes.values())
+    while total > max_bytes:
+        candidates = [k for k in _datasets if k != keep]
+        if not candidates:
+            break
+        idle = [k for k in candidates if not _datasets[k]['sessions']]
+        key = (idle or candidates)[0]
+        entry = _datasets.pop(key)
+        for session in entry['sessions']:
+            _sessions.pop(session, None)
+        drop_artifacts(entry['artifacts'])
+        total -= sizes[key]
+
+
+def publish(key, df, name=None, max_bytes=None):
+    with _lock:
+        if key in _datasets:
+            return _datasets[key]['df']
+        _datasets[key] = _entry(df, name or key[:12])
+        _evict(key, REGISTRY_MAX_BYTES if max_bytes is None else max_bytes)
+    return df
+
+
+def acquire(key, load=None, session=None, name=None, max_bytes=None):
+    # Ambil dataset bersama; kalau belum ada dimuat sekali lewat load(), sesi lain yang meminta kunci sama menunggu
+    session = current_session() if session is None else session
+    df = None
+    with _lock:
+        entry = _datasets.get(key)
+        if entry is not None:
+            entry['hits'] += 1
+        elif load is None:
+            return None
+        else:
+            loading = _loading.setdefault(key, threading.Lock())
+    if entry is None:
+        with loading:
+            with _lock:
+                entry = _datasets.get(key)
+                if entry is not None:
+                    entry['hits'] += 1
+            if entry is None:
+                df = load()
+                if df is None:
+                    return None
+                publish(key, df, name, max_bytes)
+        with _lock:
+            _loading.pop(key, None)
+            entry = _datasets.get(key)
+        if entry is None:
+            return df
+    with _lock:
+        if key in _datasets:
+            _datasets.move_to_end(key)
+            entry['last_used'] = time.time()
+            if session is not None and _sessions.get(session) != key:
+                _release(session)
+                _sessions[session] = key
+                entry['sessions'].add(session)
+            # Artefak bisa bertambah sejak dataset dipublikasikan, jadi anggaran dicek ulang tiap kali dipakai
+            _evict(key, REGISTRY_MAX_BYTES if max_bytes is None else max_bytes)
+    return entry['df']
+
+
+def release(session=None):
+    # Sesi berhenti memegang datasetnya (ganti ZIP/batal) supaya dataset itu yang lebih dulu dibuang saat memori penuh
+    session = current_session() if session is None else session
+    with _lock:
+        _release(session)
+
+
+def registry_stats():
+    with _lock:
+        _prune_sessions()
+        rows = [
+            (entry['name'], len(entry['df']), entry['bytes'] / 1024 ** 2, artifact_bytes(entry['artifacts']) / 1024 ** 2,
+             len(entry['sessions']), entry['hits'], time.time() - entry['last_used'])
+            for entry in reversed(_datasets.values())
+        ]
+    columns = ['Dataset', 'Baris', 'MB', 'Artefak MB', 'Sesi', 'Hit', 'Idle (s)']
+    return pd.DataFrame(rows, columns=columns).round({'MB': 1, 'Artefak MB': 1, 'Idle (s)': 0})
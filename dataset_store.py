@@ -0,0 +1,250 @@
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import threading
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:
+    pa = None
+    feather = None
+
+from engine import detect_schema
+from export_cache import load_or_parse, zip_digest
+from ingest import ARROW_STRING, FILL_VALUES, fingerprint, partition_frames, set_fingerprint
+
+STORE_DIR = os.environ.get('NOLIMIT_STORE_DIR', os.path.join(tempfile.gettempdir(), 'nolimit-store'))
+CATALOG = 'catalog.json'
+URL_HASHES = 'urls.npy'
+EMPTY_URLS = ['', '-']
+
+_store_lock = threading.Lock()
+
+
+def schema_dir(schema, store_dir=None):
+    return os.path.join(store_dir or STORE_DIR, schema)
+
+
+def list_schemas(store_dir=None):
+    root = store_dir or STORE_DIR
+    if not os.path.isdir(root):
+        return []
+    return sorted(name for name in os.listdir(root) if os.path.exists(os.path.join(root, name, CATALOG)))
+
+
+def read_catalog(schema, store_dir=None):
+    path = os.path.join(schema_dir(schema, store_dir), CATALOG)
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)['partitions']
+
+
+def _replace_atomic(path, write):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _write_catalog(schema, partitions, store_dir=None):
+    def write(path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'partitions': partitions}, f, ensure_ascii=False, indent=2)
+    _replace_atomic(os.path.join(schema_dir(schema, store_dir), CATALOG), write)
+
+
+def _url_hashes(urls):
+    values = urls.astype(str).to_numpy(dtype=object)
+    return pd.util.hash_array(values), ~np.isin(values, EMPTY_URLS)
+
+
+def find_partition(digest, store_dir=None):
+    for schema in list_schemas(store_dir):
+        for partition in read_catalog(schema, store_dir):
+            if partition['digest'] == digest:
+                return schema, partition
+    return None, None
+
+
+def append_export(zip_file, source, ingest_date=None, store_dir=None, digest=None):
+    # Hanya ZIP baru yang diparse; ZIP yang sudah pernah masuk dikenali dari digest isinya
+    digest = digest or zip_digest(zip_file)
+    schema, existing = find_partition(digest, store_dir)
+    if existing:
+        return {**existing, 'schema': schema, 'status': 'exists'}
+    if feather is None:
+        raise RuntimeError("pyarrow diperlukan untuk dataset store")
+
+    df, stats = load_or_parse(digest, zip_file)
+    if stats['errors']:
+        raise ValueError(f"ZIP tidak lengkap terbaca: {stats['errors']}")
+    if df.empty:
+        raise ValueError("tidak ada data CSV dalam ZIP")
+    schema = detect_schema(df)
+    ingest_date = ingest_date or datetime.date.today().isoformat()
+    directory = schema_dir(schema, store_dir)
+    os.makedirs(directory, exist_ok=True)
+
+    with _store_lock:
+        # Dicek ulang di dalam lock: append lain untuk ZIP yang sama bisa selesai selagi ZIP ini diparse
+        existing_schema, existing = find_partition(digest, store_dir)
+        if existing:
+            return {**existing, 'schema': existing_schema, 'status': 'exists'}
+        partitions = read_catalog(schema, store_dir)
+        hashes_path = os.path.join(directory, URL_HASHES)
+        seen = np.load(hashes_path) if os.path.exists(hashes_path) else np.empty(0, dtype=np.uint64)
+
+        # Dedup per URL: terhadap partisi lama dan di dalam ZIP ini sendiri; URL kosong tidak didedup
+        hashes, has_url = _url_hashes(df['url'])
+        duplicate = np.zeros(len(df), dtype=bool)
+        rows = np.flatnonzero(has_url)
+        duplicate[rows] = np.isin(hashes[rows], seen) | pd.Series(hashes[rows]).duplicated().to_numpy()
+        new = df.loc[~duplicate].reset_index(drop=True)
+
+        partition_id = f'{ingest_date}_{digest[:12]}'
+        table = pa.Table.from_pandas(new, preserve_index=False)
+        _replace_atomic(os.path.join(directory, f'{partition_id}.arrow'),
+                        lambda path: feather.write_feather(table, path, compression='uncompressed'))
+        added = hashes[has_url & ~duplicate]
+
+        def write_hashes(path):
+            with open(path, 'wb') as f:
+                np.save(f, np.union1d(seen, added))
+        _replace_atomic(hashes_path, write_hashes)
+
+        partition = {
+            'id': partition_id,
+            'source': source,
+            'digest': digest,
+            'fingerprint': fingerprint(new),
+            'ingest_date': ingest_date,
+            'rows': len(new),
+            'duplicates': int(duplicate.sum()),
+            'skipped_lines': stats['skipped_lines'],
+        }
+        partitions.append(partition)
+        partitions.sort(key=lambda p: (p['ingest_date'], p['id']))
+        _write_catalog(schema, partitions, store_dir)
+    return {**partition, 'schema': schema, 'status': 'added'}
+
+
+def select_partitions(partitions, ids=None, since=None, until=None, sources=None):
+    # Pruning dari katalog saja; file partisi yang tidak terpilih tidak dibuka sama sekali
+    selected = []
+    for p in partitions:
+        if ids is not None and p['id'] not in ids:
+            continue
+        if since and p['ingest_date'] < since:
+            continue
+        if until and p['ingest_date'] > until:
+            continue
+        if sources is not None and p['source'] not in sources:
+            continue
+        selected.append(p)
+    return selected
+
+
+def _concat_column(values):
+    if all(isinstance(v.dtype, pd.CategoricalDtype) for v in values):
+        if values[0].cat.ordered:
+            return pd.concat(values, ignore_index=True)
+        # Kategori tiap partisi berbeda; union_categoricals menjaga kolom tetap kategori
+        return pd.Series(union_categoricals(values))
+    return pd.concat([v.astype(ARROW_STRING) if isinstance(v.dtype, pd.CategoricalDtype) else v for v in values],
+                     ignore_index=True)
+
+
+def _concat(frames):
+    if len(frames) == 1:
+        return frames[0]
+    columns = list(dict.fromkeys(col for frame in frames for col in frame.columns))
+    data = {}
+    for col in columns:
+        values = [
+            frame[col] if col in frame.columns
+            else pd.Series([FILL_VALUES.get(col, '')] * len(frame), dtype='category')
+            for frame in frames
+        ]
+        data[col] = _concat_column(values)
+    return pd.DataFrame(data)
+
+
+def concat_partitions(frames):
+    # Batas partisi (fingerprint, awal, akhir) disimpan di attrs supaya indeks dan matriks term dibangun per partisi
+    # lalu digabung; frame yang sudah berpartisi menyumbang batas partisinya sendiri
+    bounds, start = [], 0
+    for frame in frames:
+        for lo, hi, part in partition_frames(frame):
+            bounds.append((fingerprint(part), start + lo, start + hi))
+        start += len(frame)
+    df = _concat(frames)
+    df.attrs.update(normalized=True, partitions=bounds)
+    return df
+
+
+def load_partition(schema, partition, store_dir=None):
+    path = os.path.join(schema_dir(schema, store_dir), f"{partition['id']}.arrow")
+    df = feather.read_table(path, memory_map=True).to_pandas()
+    df.attrs['normalized'] = True
+    return set_fingerprint(df, partition['fingerprint'])
+
+
+def store_fingerprint(partitions):
+    return hashlib.blake2b('|'.join(p['fingerprint'] for p in partitions).encode(), digest_size=20).hexdigest()
+
+
+def load_store(schema, ids=None, since=None, until=None, sources=None, store_dir=None):
+    partitions = select_partitions(read_catalog(schema, store_dir), ids, since, until, sources)
+    if not partitions:
+        return pd.DataFrame(), []
+    df = concat_partitions([load_partition(schema, p, store_dir) for p in partitions])
+    set_fingerprint(df, store_fingerprint(partitions))
+    return df, partitions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Dataset store NoLimit: tambah ZIP export sebagai partisi, dedup per URL.")
+    parser.add_argument('--store-dir', default=None, help="folder store (default: NOLIMIT_STORE_DIR)")
+    commands = parser.add_subparsers(dest='command', required=True)
+    add = commands.add_parser('add', help="tambahkan ZIP export sebagai partisi baru")
+    add.add_argument('zips', nargs='+')
+    add.add_argument('--date', default=None, help="tanggal ingest YYYY-MM-DD (default: hari ini)")
+    commands.add_parser('list', help="daftar partisi per jenis data")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == 'add':
+        failed = 0
+        for path in args.zips:
+            try:
+                p = append_export(path, os.path.basename(path), args.date, args.store_dir)
+            except (OSError, ValueError, RuntimeError) as e:
+                failed += 1
+                print(f"GAGAL {path}: {e}", file=sys.stderr)
+                continue
+            print(f"{p['status']:>7} {p['schema']}/{p['id']}: {p['rows']} baris, {p['duplicates']} duplikat URL dibuang")
+        return 1 if failed else 0
+    for schema in list_schemas(args.store_dir):
+        for p in read_catalog(schema, args.store_dir):
+            print(f"{schema}/{p['id']}  {p['ingest_date']}  {p['rows']:>9} baris  {p['source']}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,166 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import Future
+
+DOWNLOAD_DIR = os.environ.get('NOLIMIT_DOWNLOAD_DIR', os.path.join(tempfile.gettempdir(), 'nolimit-downloads'))
+DOWNLOAD_MAX_BYTES = int(os.environ.get('NOLIMIT_DOWNLOAD_MAX_BYTES', 8 * 1024 ** 3))
+CHUNK_SIZE = 1024 * 1024
+TIMEOUT = 60
+
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+def _spool_paths(url, download_dir):
+    base = os.path.join(download_dir, hashlib.sha1(url.encode()).hexdigest())
+    return base + '.zip', base + '.part', base + '.json'
+
+
+def _read_meta(meta_path):
+    try:
+        with open(meta_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_meta(meta_path, meta):
+    tmp_path = meta_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, meta_path)
+
+
+def _validators(response):
+    return {
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified'),
+    }
+
+
+def _fetch(url, progress, download_dir):
+    os.makedirs(download_dir, exist_ok=True)
+    zip_path, part_path, meta_path = _spool_paths(url, download_dir)
+    meta = _read_meta(meta_path)
+
+    request = urllib.request.Request(url)
+    offset = 0
+    if meta.get('complete') and os.path.exists(zip_path):
+        # Conditional GET: file yang tidak berubah tidak diunduh ulang
+        if meta.get('etag'):
+            request.add_header('If-None-Match', meta['etag'])
+        if meta.get('last_modified'):
+            request.add_header('If-Modified-Since', meta['last_modified'])
+    elif os.path.exists(part_path) and (meta.get('etag') or meta.get('last_modified')):
+        offset = os.path.getsize(part_path)
+        request.add_header('Range', f'bytes={offset}-')
+        request.add_header('If-Range', meta.get('etag') or meta['last_modified'])
+
+    try:
+        response = urllib.request.urlopen(request, timeout=TIMEOUT)
+    except urllib.error.HTTPError as e:
+        if e.code == 304:
+            os.utime(zip_path)
+            return zip_path
+        if e.code == 416 and offset:
+            os.remove(part_path)
+            return _fetch(url, progress, download_dir)
+        raise
+
+    with response:
+        length = response.headers.get('Content-Length')
+        if response.status == 206:
+            content_range = re.match(r'bytes (\d+)-', response.headers.get('Content-Range', ''))
+            if not content_range or int(content_range.group(1)) != offset:
+                raise OSError(f'Content-Range tidak sesuai untuk resume dari byte {offset}')
+            mode = 'ab'
+        else:
+            offset = 0
+            mode = 'wb'
+        total = offset + int(length) if length else None
+        _write_meta(meta_path, {'url': url, 'complete': False, **_validators(response)})
+
+        done = offset
+        with open(part_path, mode) as f:
+            for chunk in iter(lambda: response.read(CHUNK_SIZE), b''):
+                f.write(chunk)
+                done += len(chunk)
+                if progress:
+                    progress(done, total)
+
+    if total is not None and done != total:
+        raise OSError(f'Unduhan terputus: {done} dari {total} byte')
+    os.replace(part_path, zip_path)
+    meta = _read_meta(meta_path)
+    _write_meta(meta_path, {**meta, 'complete': True, 'size': done})
+    return zip_path
+
+
+def download_zip(url, progress=None, download_dir=None):
+    download_dir = download_dir or DOWNLOAD_DIR
+    key = (url, download_dir)
+    with _inflight_lock:
+        future = _inflight.get(key)
+        owner = future is None
+        if owner:
+            future = Future()
+            _inflight[key] = future
+    if not owner:
+        # URL yang sama sedang diunduh sesi lain, tunggu hasilnya saja
+        return future.result()
+    try:
+        path = _fetch(url, progress, download_dir)
+        future.set_result(path)
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+    evict(download_dir=download_dir, keep=path)
+    return path
+
+
+def evict(max_bytes=None, download_dir=None, keep=None):
+    # .zip, .part dan .json satu URL dibuang bersama, dari yang paling lama tidak dipakai; URL yang sedang diunduh dilewati
+    max_bytes = DOWNLOAD_MAX_BYTES if max_bytes is None else max_bytes
+    download_dir = download_dir or DOWNLOAD_DIR
+    if not os.path.isdir(download_dir):
+        return []
+    with _inflight_lock:
+        skip = {os.path.basename(_spool_paths(url, download_dir)[0])[:-len('.zip')]
+                for url, directory in _inflight if directory == download_dir}
+    if keep is not None:
+        skip.add(os.path.basename(keep)[:-len('.zip')])
+    groups = {}
+    for name in os.listdir(download_dir):
+        base, ext = os.path.splitext(name)
+        if ext not in ('.zip', '.part', '.json'):
+            continue
+        try:
+            st = os.stat(os.path.join(download_dir, name))
+        except FileNotFoundError:
+            continue
+        mtime, size, names = groups.get(base, (0, 0, []))
+        groups[base] = (max(mtime, st.st_mtime), size + st.st_size, names + [name])
+    total = sum(size for _, size, _ in groups.values())
+    removed = []
+    for base, (_, size, names) in sorted(groups.items(), key=lambda item: item[1][0]):
+        if total <= max_bytes:
+            break
+        if base in skip:
+            continue
+        for name in names:
+            try:
+                os.remove(os.path.join(download_dir, name))
+            except FileNotFoundError:
+                continue
+            removed.append(name)
+        total -= size
+    return removed
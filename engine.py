@@ -0,0 +1,193 @@
+import html
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from clustering import get_topic_clusters
+from highlight import highlight_terms, highlight_text
+from ingest import fingerprint
+from label_index import get_label_index, labels_mask
+from profiler import stage
+from search import field_mask, parse_scoped_keywords
+from topics import summarize_topics
+
+RESULT_CACHE_SIZE = 32
+
+SCHEMAS = {
+    'tier': {'key': 'title', 'text': ['title', 'body'], 'sentiment': 'sentiment', 'tier': 'tier'},
+    'sosmed': {'key': 'content', 'text': ['content'], 'sentiment': 'final_sentiment', 'tier': None},
+}
+
+_results = OrderedDict()
+_results_lock = threading.Lock()
+
+
+def detect_schema(df):
+    return 'tier' if 'tier' in df.columns else 'sosmed'
+
+
+def _clauses(query, fields):
+    # Satu triple klausa per scope: indeks 0 untuk klausa bebas, lalu satu per kolom teks
+    scoped = parse_scoped_keywords(query, fields)
+    return tuple(
+        (frozenset(tuple(group) for group in includes), frozenset(phrases), frozenset(excludes))
+        for includes, phrases, excludes in (scoped.get(scope, ([], [], [])) for scope in [None] + fields)
+    )
+
+
+def _as_lists(clauses):
+    return [list(g) for g in clauses[0]], list(clauses[1]), list(clauses[2])
+
+
+def _match(df, field, clauses, base, whole_words):
+    if not any(clauses) or not base.any():
+        return base.copy()
+    return field_mask(df, field, *_as_lists(clauses), base=base, whole_words=whole_words)
+
+
+def _narrow_fields(df, fields, field_masks, old, new, whole_words):
+    # field_masks[f]: baris yang cocok di kolom f dan tidak di kolom sebelumnya (body tidak dipindai untuk baris
+    # yang sudah cocok di title). Klausa baru hanya diuji ke baris yang lolos klausa lama.
+    added = tuple(tuple(n - o for n, o in zip(new_scope, old_scope)) for new_scope, old_scope in zip(new, old))
+    if any(any(scope) for scope in added[1:]):
+        keep = np.logical_or.reduce([field_masks[f] for f in fields])
+        for field, scope in zip(fields, added[1:]):
+            keep = _match(df, field, scope, keep, whole_words)
+        field_masks = {f: m & keep for f, m in field_masks.items()}
+    if not any(added[0]):
+        return field_masks
+    prior_old = np.zeros(len(df), dtype=bool)
+    prior_new = np.zeros(len(df), dtype=bool)
+    narrowed = {}
+    for field in fields:
+        # Baris yang dulu cocok di kolom sebelumnya tapi gagal dengan klausa baru diuji ulang di kolom ini
+        retry = prior_old & ~prior_new
+        narrowed[field] = _match(df, field, added[0], field_masks[field], whole_words) | _match(df, field, new[0], retry, whole_words)
+        prior_old |= field_masks[field]
+        prior_new |= narrowed[field]
+    return narrowed
+
+
+def _attribute_mask(df, schema, sentiment, labels, label_mode):
+    mask = np.ones(len(df), dtype=bool)
+    if sentiment != 'All':
+        values = df[schema['sentiment']]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            # Bandingkan kategori sekali lalu petakan lewat kode; kode -1 (NaN) jatuh ke False terakhir
+            hits = np.append(values.cat.categories.str.lower() == sentiment, False)
+            mask &= hits[values.cat.codes.to_numpy()]
+        else:
+            mask &= (values.str.lower() == sentiment).to_numpy()
+    if labels:
+        mask &= labels_mask(get_label_index(df), labels, match_all=label_mode == 'AND')
+    return mask
+
+
+def _cached(key):
+    with _results_lock:
+        if key in _results:
+            _results.move_to_end(key)
+            return _results[key]
+    return None
+
+
+def _clause_count(clauses):
+    return sum(len(part) for scope in clauses for part in scope)
+
+
+def _refinable(filter_key, clauses):
+    # Hasil sebelumnya dengan filter sama dan klausa yang merupakan subset bisa langsung dipersempit
+    best = None
+    with _results_lock:
+        for key, entry in _results.items():
+            previous = key[-1]
+            if key[:-1] != filter_key or previous == clauses:
+                continue
+            if all(old <= new for old_scope, new_scope in zip(previous, clauses) for old, new in zip(old_scope, new_scope)):
+                if best is None or _clause_count(previous) > _clause_count(best[0]):
+                    best = (previous, entry)
+    return best
+
+
+def run_query(df, sentiment='All', labels=(), label_mode='OR', query='', cluster_threshold=None, whole_words=False):
+    schema = SCHEMAS[detect_schema(df)]
+    fields = schema['text']
+    n_rows = len(df)
+    clauses = _clauses(query, fields)
+    labels = tuple(sorted(labels))
+    filter_key = (fingerprint(df), n_rows, sentiment, labels, label_mode if len(labels) > 1 else 'OR', cluster_threshold, whole_words)
+    key = filter_key + (clauses,)
+
+    entry = _cached(key)
+    status = 'hit'
+    if entry is None:
+        refinable = _refinable(filter_key, clauses)
+        if refinable:
+            previous, base = refinable
+            status = 'refined'
+            field_masks = {f: np.unpackbits(bits, count=n_rows).astype(bool) for f, bits in base['fields'].items()}
+        else:
+            status = 'miss'
+            with stage('filter', n_rows) as record:
+                attribute_mask = _attribute_mask(df, schema, sentiment, labels, label_mode)
+                record['rows_out'] = int(attribute_mask.sum())
+            # Tanpa klausa semua baris dianggap cocok di kolom pertama
+            field_masks = {f: attribute_mask if i == 0 else np.zeros(n_rows, dtype=bool) for i, f in enumerate(fields)}
+            previous = _clauses('', fields)
+
+        if previous != clauses:
+            # Query cocok kalau klausa berscope terpenuhi di kolomnya dan klausa bebas di salah satu field (title atau body)
+            with stage('keyword', n_rows) as record:
+                field_masks = _narrow_fields(df, fields, field_masks, previous, clauses, whole_words)
+                record['rows_out'] = int(np.logical_or.reduce(list(field_masks.values())).sum())
+        mask = np.logical_or.reduce(list(field_masks.values()))
+        columns = [c for c in (schema['key'], schema['sentiment'], 'url', schema['tier']) if c]
+        filtered = df.loc[mask, columns]
+        if cluster_threshold:
+            # Topik digabung per cluster near-duplicate; kolom teks diganti teks wakil cluster
+            with stage('cluster', n_rows):
+                clusters = get_topic_clusters(df, schema['key'], cluster_threshold)
+            filtered = filtered.assign(**{schema['key']: clusters[mask]})
+        with stage('summarize', len(filtered)) as record:
+            summary = summarize_topics(filtered, schema['key'], schema['sentiment'], tier_col=schema['tier'])
+            record['rows_out'] = len(summary)
+        entry = {
+            'fields': {f: np.packbits(m) for f, m in field_masks.items()},
+            'mask': np.packbits(mask),
+            'rows': int(mask.sum()),
+            'summary': summary,
+        }
+        with _results_lock:
+            _results[key] = entry
+            while len(_results) > RESULT_CACHE_SIZE:
+                _results.popitem(last=False)
+
+    return {
+        'mask': np.unpackbits(entry['mask'], count=n_rows).astype(bool),
+        'rows': entry['rows'],
+        'summary': entry['summary'],
+        'cache': status,
+    }
+
+
+def sentiment_color(sent):
+    s = sent.lower()
+    if s == 'positive': return f'<span style="color:green;font-weight:bold">{s}</span>'
+    if s == 'negative': return f'<span style="color:red;font-weight:bold">{s}</span>'
+    if s == 'neutral': return f'<span style="color:gray;font-weight:bold">{s}</span>'
+    return sent
+
+
+def link_html(url):
+    return f'<a href="{html.escape(str(url))}" target="_blank">Link</a>' if url != '-' else '-'
+
+
+def decorate(summary, text_col, highlight_words):
+    terms = highlight_terms(highlight_words)
+    return summary.assign(**{
+        text_col: summary[text_col].apply(lambda text: highlight_text(str(text), terms)),
+        'Sentiment': summary['Sentiment'].apply(sentiment_color),
+        'Link': summary['Link'].apply(link_html),
+    })
@@ -0,0 +1,126 @@
+import hashlib
+import json
+import os
+import tempfile
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:
+    pa = None
+    feather = None
+
+from ingest import normalize_export, read_zip, set_fingerprint
+
+CACHE_DIR = os.environ.get('NOLIMIT_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'nolimit-cache'))
+CACHE_MAX_BYTES = int(os.environ.get('NOLIMIT_CACHE_MAX_BYTES', 4 * 1024 ** 3))
+# Naikkan kalau kolom/normalisasi hasil ingest berubah supaya cache lama tidak terpakai
+CACHE_VERSION = '4'
+CHUNK_SIZE = 1024 * 1024
+STATS_KEY = b'nolimit_stats'
+
+
+def zip_digest(zip_file):
+    h = hashlib.blake2b(digest_size=20)
+    if isinstance(zip_file, (str, os.PathLike)):
+        with open(zip_file, 'rb') as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                h.update(chunk)
+    else:
+        zip_file.seek(0)
+        for chunk in iter(lambda: zip_file.read(CHUNK_SIZE), b''):
+            h.update(chunk)
+        zip_file.seek(0)
+    return h.hexdigest()
+
+
+def source_key(zip_file):
+    # Identitas murah sebuah ZIP untuk memo digest: path + mtime + ukuran, atau file_id dari st.file_uploader
+    if isinstance(zip_file, (str, os.PathLike)):
+        st = os.stat(zip_file)
+        return os.fspath(zip_file), st.st_mtime_ns, st.st_size
+    file_id = getattr(zip_file, 'file_id', None)
+    return ('upload', file_id, getattr(zip_file, 'size', None)) if file_id else None
+
+
+def cache_path(digest):
+    return os.path.join(CACHE_DIR, f'{digest}.v{CACHE_VERSION}.arrow')
+
+
+def load(digest):
+    path = cache_path(digest)
+    if feather is None or not os.path.exists(path):
+        return None
+    try:
+        table = feather.read_table(path, memory_map=True)
+        os.utime(path)
+    except FileNotFoundError:
+        return None
+    except (OSError, pa.ArrowException):
+        os.remove(path)
+        return None
+    stats = json.loads(table.schema.metadata.get(STATS_KEY, b'{}'))
+    return table.to_pandas(), stats
+
+
+def store(digest, df, stats):
+    if feather is None:
+        return
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[STATS_KEY] = json.dumps(stats).encode()
+    table = table.replace_schema_metadata(metadata)
+    fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR, suffix='.tmp')
+    os.close(fd)
+    try:
+        feather.write_feather(table, tmp_path, compression='uncompressed')
+        os.replace(tmp_path, cache_path(digest))
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    evict()
+
+
+def evict(max_bytes=None):
+    max_bytes = CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    if not os.path.isdir(CACHE_DIR):
+        return []
+    entries = []
+    for name in os.listdir(CACHE_DIR):
+        if name.endswith('.arrow'):
+            # Sesi lain bisa membuang file yang sama di antara listdir dan stat/remove
+            try:
+                st = os.stat(os.path.join(CACHE_DIR, name))
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, name))
+    entries.sort()
+    total = sum(size for _, size, _ in entries)
+    removed = []
+    for _, size, name in entries:
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(os.path.join(CACHE_DIR, name))
+        except FileNotFoundError:
+            continue
+        total -= size
+        removed.append(name)
+    return removed
+
+
+def load_or_parse(digest, zip_file, max_workers=None):
+    cached = load(digest)
+    if cached is not None:
+        df, stats = cached
+        df.attrs['normalized'] = True
+        stats = {**stats, 'cache': 'hit'}
+    else:
+        df, stats = read_zip(zip_file, max_workers=max_workers)
+        df = normalize_export(df)
+        if not stats['errors']:
+            store(digest, df, stats)
+        stats = {**stats, 'cache': 'miss'}
+    set_fingerprint(df, digest)
+    return df, stats
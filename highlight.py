@@ -0,0 +1,31 @@
+import functools
+import html
+import re
+
+
+def highlight_terms(highlight_words):
+    highlight_tokens = re.findall(r'\"[^\"]+\"|\S+', highlight_words)
+    return tuple(sorted(set(h.strip('"').lower() for h in highlight_tokens) - {''}))
+
+
+@functools.lru_cache(maxsize=64)
+def compile_terms(terms):
+    # Satu alternation untuk semua kata; yang terpanjang didahulukan supaya frasa menang atas potongannya
+    if not terms:
+        return None
+    ordered = sorted(terms, key=lambda term: (-len(term), term))
+    return re.compile('|'.join(re.escape(term) for term in ordered), re.IGNORECASE)
+
+
+@functools.lru_cache(maxsize=8192)
+def highlight_text(text, terms):
+    pattern = compile_terms(terms)
+    if pattern is None:
+        return html.escape(text)
+    parts, last = [], 0
+    for match in pattern.finditer(text):
+        parts.append(html.escape(text[last:match.start()]))
+        parts.append(f'<mark>{html.escape(match.group())}</mark>')
+        last = match.end()
+    parts.append(html.escape(text[last:]))
+    return ''.join(parts)
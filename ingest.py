@@ -0,0 +1,306 @@
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import threading
+import warnings
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from pandas.errors import ParserWarning
+
+from profiler import stage
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa = None
+    pa_csv = None
+
+if pa is None:
+    ARROW_STRING = object
+else:
+    try:
+        ARROW_STRING = pd.StringDtype('pyarrow', na_value=np.nan)
+    except TypeError:
+        ARROW_STRING = 'string[pyarrow_numpy]'
+
+TIER_COLUMNS = ['title', 'body', 'url', 'sentiment', 'label', 'tier']
+SOSMED_COLUMNS = ['content', 'final_sentiment', 'label', 'url', 'post_type', 'object_group', 'specific_resource']
+USED_COLUMNS = list(dict.fromkeys(TIER_COLUMNS + SOSMED_COLUMNS))
+
+TEXT_COLUMNS = ['title', 'body', 'content']
+CATEGORY_COLUMNS = ['sentiment', 'final_sentiment', 'label', 'post_type', 'object_group', 'specific_resource']
+TIER_ORDER = ['Tier 1', 'Tier 2', 'Tier 3', '-', '']
+FILL_VALUES = {'tier': '-', 'url': '-'}
+
+DELIMITER = ';'
+QUOTECHAR = '"'
+
+
+def list_csv_members(zip_path):
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        return [f for f in zip_ref.namelist() if f.endswith('.csv')]
+
+
+def _read_header(zip_ref, member):
+    with zip_ref.open(member) as file:
+        return list(pd.read_csv(file, sep=DELIMITER, quotechar=QUOTECHAR, nrows=0, engine='python').columns)
+
+
+def invalid_row_handler(short_rows, skipped):
+    # Baris dengan kolom kurang disimpan teksnya untuk diparse terpisah (kolom yang hilang jadi NaN);
+    # hanya baris dengan kolom lebih yang dibuang, sama seperti engine C/python
+    def on_invalid_row(row):
+        if row.actual_columns < row.expected_columns:
+            short_rows.append(row.text)
+        else:
+            skipped.append(row.number)
+        return 'skip'
+    return on_invalid_row
+
+
+def parse_short_rows(header, short_rows, usecols):
+    # Hanya baris pendek yang diparse ulang, bukan seluruh file; ditaruh di akhir potongan file asalnya
+    df = pd.read_csv(io.StringIO('\n'.join(short_rows)), sep=DELIMITER, quotechar=QUOTECHAR, header=None,
+                     names=header, dtype=str, engine='c')
+    return df[usecols]
+
+
+def _parse_pyarrow(zip_ref, member, header, usecols, use_threads):
+    short_rows = []
+    skipped = []
+    with zip_ref.open(member) as file:
+        table = pa_csv.read_csv(
+            file,
+            read_options=pa_csv.ReadOptions(use_threads=use_threads),
+            parse_options=pa_csv.ParseOptions(
+                delimiter=DELIMITER, quote_char=QUOTECHAR,
+                newlines_in_values=True, invalid_row_handler=invalid_row_handler(short_rows, skipped),
+            ),
+            convert_options=pa_csv.ConvertOptions(
+                include_columns=usecols,
+                column_types={c: pa.string() for c in usecols},
+                strings_can_be_null=True,
+            ),
+        )
+    df = table.to_pandas()
+    if short_rows:
+        df = pd.concat([df, parse_short_rows(header, short_rows, usecols)], ignore_index=True)
+    return df, len(skipped)
+
+
+def _parse_c(zip_ref, member, usecols):
+    # Engine C tidak mendeteksi baris rusak kalau usecols dipakai, jadi kolom dipangkas setelah parsing
+    with zip_ref.open(member) as file, warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always', ParserWarning)
+        df = pd.read_csv(file, sep=DELIMITER, quotechar=QUOTECHAR, dtype=str, engine='c', on_bad_lines='warn')
+    skipped = sum(str(w.message).count('Skipping line') for w in caught if issubclass(w.category, ParserWarning))
+    return df[usecols], skipped
+
+
+def _parse_tolerant(zip_ref, member, columns):
+    skipped = []
+
+    def on_bad_line(line):
+        skipped.append(line)
+        return None
+
+    with zip_ref.open(member) as file:
+        df = pd.read_csv(
+            file, sep=DELIMITER, quotechar=QUOTECHAR, dtype=str,
+            engine='python', on_bad_lines=on_bad_line,
+        )
+    return df[[c for c in df.columns if c in columns]], len(skipped)
+
+
+def parse_member(zip_path, member, columns=None, use_threads=True):
+    columns = USED_COLUMNS if columns is None else columns
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        try:
+            header = _read_header(zip_ref, member)
+            usecols = [c for c in header if c in columns]
+            if pa_csv is not None:
+                df, skipped = _parse_pyarrow(zip_ref, member, header, usecols, use_threads)
+            else:
+                df, skipped = _parse_c(zip_ref, member, usecols)
+        except Exception:
+            # Jalur lambat hanya untuk file yang ditolak parser cepat
+            try:
+                df, skipped = _parse_tolerant(zip_ref, member, columns)
+            except Exception as e:
+                return member, None, 0, str(e)
+    return member, df, skipped, None
+
+
+def spool_zip(zip_file):
+    if isinstance(zip_file, (str, os.PathLike)):
+        return os.fspath(zip_file), False
+    if hasattr(zip_file, 'seek'):
+        zip_file.seek(0)
+    with tempfile.NamedTemporaryFile(suffix='.zip', delete=False) as tmp:
+        shutil.copyfileobj(zip_file, tmp, 1024 * 1024)
+    return tmp.name, True
+
+
+def read_zip(zip_file, columns=None, max_workers=None):
+    zip_path, is_temp = spool_zip(zip_file)
+    try:
+        members = list_csv_members(zip_path)
+        workers = min(len(members), max_workers or os.cpu_count() or 1)
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(
+                    parse_member, [zip_path] * len(members), members,
+                    [columns] * len(members), [False] * len(members),
+                ))
+        else:
+            results = [parse_member(zip_path, m, columns) for m in members]
+    finally:
+        if is_temp:
+            os.unlink(zip_path)
+    return combine_members(results, len(members))
+
+
+def combine_members(results, n_members):
+    # results: tuple (member, df, skipped, error) dari parse_member, urut sesuai isi ZIP
+    dfs = [df for _, df, _, _ in results if df is not None]
+    df = pd.concat(dfs, ignore_index=True) if dfs else pd.DataFrame()
+    stats = {
+        'members': n_members,
+        'rows': len(df),
+        'skipped_lines': sum(skipped for _, _, skipped, _ in results),
+        'errors': [(member, error) for member, _, _, error in results if error],
+    }
+    return df, stats
+
+
+def clean_column(values, col):
+    values = values.astype(str).where(values.notna()).str.strip("'")
+    return values.fillna(FILL_VALUES.get(col, ''))
+
+
+def normalize_export(df):
+    # Sekali saat ingest: buang kutip, isi kosong, kategori untuk kolom berkardinalitas rendah, string Arrow untuk teks
+    if df.attrs.get('normalized'):
+        return df
+    columns = {}
+    for col in df.columns:
+        values = clean_column(df[col], col)
+        if col == 'tier':
+            # Tier di luar daftar jadi NaN, bukan nilai asing di dalam kategori berurutan
+            columns[col] = pd.Categorical(values.where(values.isin(TIER_ORDER)), categories=TIER_ORDER, ordered=True)
+        elif col in CATEGORY_COLUMNS:
+            columns[col] = values.astype('category')
+        elif col == 'url':
+            # URL yang berulang disimpan sekali (dictionary encoding); yang hampir unik tetap string Arrow
+            columns[col] = values.astype('category') if values.nunique() < len(values) // 2 else values.astype(ARROW_STRING)
+        else:
+            columns[col] = values.astype(ARROW_STRING)
+    normalized = pd.DataFrame(columns, index=df.index)
+    normalized.attrs.update(df.attrs)
+    normalized.attrs['normalized'] = True
+    return normalized
+
+
+def memory_report(df):
+    usage = df.memory_usage(deep=True, index=False)
+    return pd.DataFrame({
+        'Kolom': usage.index,
+        'Tipe': [str(df[col].dtype) for col in usage.index],
+        'MB': (usage.to_numpy() / 1024 ** 2).round(2),
+    })
+
+
+def _signature(df):
+    # attrs ikut tersalin ke frame turunan; sidik jari hanya berlaku untuk bentuk, kolom, tipe dan urutan baris yang sama
+    ends = (df.index[0], df.index[-1]) if len(df) else ()
+    return (len(df), tuple(df.columns), tuple(str(dtype) for dtype in df.dtypes)) + ends
+
+
+def set_fingerprint(df, digest):
+    df.attrs.update(fingerprint=digest, fingerprint_signature=_signature(df))
+    return df
+
+
+def fingerprint(df):
+    # Sidik jari dataset untuk kunci cache; diisi dari hash ZIP saat ingest, dihitung ulang kalau tidak ada
+    if df.attrs.get('fingerprint') is None or df.attrs.get('fingerprint_signature') != _signature(df):
+        hashed = pd.util.hash_pandas_object(df, index=False).to_numpy()
+        set_fingerprint(df, hashlib.blake2b(hashed.tobytes(), digest_size=20).hexdigest())
+    return df.attrs['fingerprint']
+
+
+def partition_frames(df):
+    # Dataset gabungan dari dataset_store menyimpan batas partisi; tiap potongan punya fingerprint sendiri
+    # supaya indeks yang mahal dibangun sekali per partisi dan dipakai ulang di pilihan partisi mana pun
+    bounds = df.attrs.get('partitions')
+    if not bounds or bounds[-1][2] != len(df):
+        return [(0, len(df), df)]
+    parts = []
+    for digest, start, stop in bounds:
+        part = df.iloc[start:stop]
+        part.attrs = {'normalized': True}
+        set_fingerprint(part, digest)
+        parts.append((start, stop, part))
+    return parts
+
+
+# Artefak per (fingerprint, jumlah baris, nama) -> (artefak, ukuran byte), urut dari yang paling lama tidak dipakai
+_artifacts = OrderedDict()
+_artifacts_lock = threading.Lock()
+ARTIFACT_MAX_BYTES = int(os.environ.get('NOLIMIT_ARTIFACT_MAX_BYTES', 4 * 1024 ** 3))
+
+
+def _nbytes(obj):
+    # Perkiraan memori artefak: array numpy, objek pandas dan isi dict/list di dalamnya
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(deep=True, index=True).sum())
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return int(obj.memory_usage(deep=True))
+    if isinstance(obj, dict):
+        return sum(_nbytes(value) for value in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return sum(_nbytes(value) for value in obj)
+    return 0
+
+
+def dataset_artifact(df, name, build):
+    # Struktur turunan (indeks, matriks) dibangun sekali per dataset dan dipakai ulang antar rerun/sesi
+    key = (fingerprint(df), len(df), name)
+    with stage(f'artifact {name}', len(df)) as record:
+        with _artifacts_lock:
+            if key in _artifacts:
+                _artifacts.move_to_end(key)
+                record['cache'] = 'hit'
+                return _artifacts[key][0]
+        record['cache'] = 'miss'
+        artifact = build(df)
+    size = _nbytes(artifact)
+    with _artifacts_lock:
+        _artifacts[key] = (artifact, size)
+        total = sum(nbytes for _, nbytes in _artifacts.values())
+        while total > ARTIFACT_MAX_BYTES and len(_artifacts) > 1:
+            _, (_, nbytes) = _artifacts.popitem(last=False)
+            total -= nbytes
+    return artifact
+
+
+def artifact_bytes(fingerprints):
+    fingerprints = set(fingerprints)
+    with _artifacts_lock:
+        return sum(nbytes for key, (_, nbytes) in _artifacts.items() if key[0] in fingerprints)
+
+
+def drop_artifacts(fingerprints):
+    fingerprints = set(fingerprints)
+    with _artifacts_lock:
+        for key in [k for k in _artifacts if k[0] in fingerprints]:
+            del _artifacts[key]
@@ -0,0 +1,274 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import pandas as pd
+
+from cube import get_cube
+from dataset_registry import acquire, current_session, publish, session_active
+from dataset_store import concat_partitions
+from export_cache import load, store
+from ingest import list_csv_members, normalize_export, parse_member, partition_frames, set_fingerprint, spool_zip
+
+FINISHED_JOBS = 4
+POLL_SECONDS = 0.5
+
+# Job ingest per digest ZIP, hidup di level proses supaya tidak ikut mati saat Streamlit rerun
+_jobs = OrderedDict()
+_jobs_lock = threading.Lock()
+
+
+def _new_job(digest, members, zip_file):
+    return {
+        'digest': digest,
+        'members': members,
+        # Per file: (nama, jumlah baris, baris rusak, error); frame-nya menunggu di 'pending' sampai disambung ke 'partial'
+        'results': {},
+        'pending': {},
+        'merge_lock': threading.Lock(),
+        'status': 'running',
+        'error': None,
+        'cancel': threading.Event(),
+        # Sesi yang sedang melihat job ini; job baru dibatalkan kalau tidak ada lagi yang memegangnya
+        'holders': set(),
+        # Path ZIP (hasil download) disimpan supaya bisa dipakai lagi setelah rerun, file upload tidak
+        'zip_file': os.fspath(zip_file) if isinstance(zip_file, (str, os.PathLike)) else None,
+        'name': os.path.basename(os.fspath(zip_file)) if isinstance(zip_file, (str, os.PathLike)) else getattr(zip_file, 'name', None),
+        'df': None,
+        'stats': None,
+        'partial': None,
+        'started': time.time(),
+    }
+
+
+def _active(job):
+    return job is not None and job['status'] in ('running', 'done') and not job['cancel'].is_set()
+
+
+def _register(job, session):
+    # Dipanggil dengan _jobs_lock terpegang; job selesai yang tidak dipegang sesi mana pun dibuang dari yang paling lama
+    job['holders'].add(session)
+    _jobs[job['digest']] = job
+    for other in _jobs.values():
+        other['holders'] = {s for s in other['holders'] if session_active(s)}
+    finished = [d for d, j in _jobs.items() if j['status'] != 'running' and not j['holders']]
+    for digest in finished[:max(0, len(finished) - FINISHED_JOBS)]:
+        del _jobs[digest]
+
+
+def _hold(job, session):
+    # Dipanggil dengan _jobs_lock terpegang
+    job['holders'].add(session)
+    _jobs.move_to_end(job['digest'])
+    return job
+
+
+def _cached_job(digest, zip_file, session):
+    cached = load(digest)
+    if cached is None:
+        return None
+    df, stats = cached
+    df.attrs['normalized'] = True
+    set_fingerprint(df, digest)
+    get_cube(df)
+    job = _new_job(digest, [], zip_file)
+    publish(digest, df, job['name'])
+    job.update(status='done', stats={**stats, 'cache': 'hit', 'parsed': stats['members']})
+    with _jobs_lock:
+        other = _jobs.get(digest)
+        if _active(other):
+            return _hold(other, session)
+        _register(job, session)
+    return job
+
+
+def get_job(digest, session=None):
+    session = current_session() if session is None else session
+    with _jobs_lock:
+        job = _jobs.get(digest)
+    if job is not None:
+        return job
+    # Job sudah tersingkir dari daftar: dipulihkan dari cache export kalau ZIP-nya pernah selesai dibaca
+    return _cached_job(digest, None, session)
+
+
+def start_ingest(digest, zip_file, max_workers=None, session=None):
+    session = current_session() if session is None else session
+    with _jobs_lock:
+        job = _jobs.get(digest)
+        if _active(job):
+            return _hold(job, session)
+
+    job = _cached_job(digest, zip_file, session)
+    if job is not None:
+        return job
+
+    zip_path, is_temp = spool_zip(zip_file)
+    job = _new_job(digest, list_csv_members(zip_path), zip_file)
+    with _jobs_lock:
+        other = _jobs.get(digest)
+        if _active(other):
+            # Sesi lain sudah memulai ZIP yang sama lebih dulu
+            if is_temp:
+                os.unlink(zip_path)
+            return _hold(other, session)
+        _register(job, session)
+    threading.Thread(target=_run, args=(job, zip_path, is_temp, max_workers), daemon=True,
+                     name=f"ingest-{digest[:8]}").start()
+    return job
+
+
+def cancel_ingest(digest, session=None):
+    # Sesi ini berhenti memegang job; pembacaan baru dihentikan kalau sudah tidak ada sesi lain yang menunggu
+    session = current_session() if session is None else session
+    with _jobs_lock:
+        job = _jobs.get(digest)
+        if job is None:
+            return
+        job['holders'].discard(session)
+        job['holders'] = {s for s in job['holders'] if session_active(s)}
+        if job['status'] == 'running' and not job['holders']:
+            job['cancel'].set()
+
+
+def _add_result(job, i, result):
+    member, df, skipped, error = result
+    if df is not None:
+        # Tiap file dinormalisasi sekali saat tiba dan punya fingerprint sendiri sebagai partisi dataset parsial
+        df = set_fingerprint(normalize_export(df), f"{job['digest']}#{i}")
+    with _jobs_lock:
+        job['results'][i] = (member, 0 if df is None else len(df), skipped, error)
+        if df is not None:
+            job['pending'][i] = df
+
+
+def _job_stats(job):
+    with _jobs_lock:
+        results = [job['results'][i] for i in sorted(job['results'])]
+    return {
+        'members': len(job['members']),
+        'rows': sum(rows for _, rows, _, _ in results),
+        'skipped_lines': sum(skipped for _, _, skipped, _ in results),
+        'errors': [(member, error) for member, _, _, error in results if error],
+    }
+
+
+def _absorb(job):
+    # Dipanggil dengan job['merge_lock'] terpegang: file yang baru tiba disambung ke dataset parsial sebagai partisi baru,
+    # jadi indeks dan matriks term partisi lama dipakai ulang
+    with _jobs_lock:
+        pending, job['pending'] = job['pending'], {}
+        partial = job['partial']
+    if pending:
+        frames = ([] if partial is None else [partial]) + [pending[i] for i in sorted(pending)]
+        partial = concat_partitions(frames)
+        # Fingerprint per jumlah file tersambung supaya artefak parsial tidak tertukar dengan hasil akhir
+        set_fingerprint(partial, f"{job['digest']}:{len(partial.attrs['partitions'])}")
+        with _jobs_lock:
+            job['partial'] = partial
+    return partial
+
+
+def _ordered(partial):
+    # Partisi disusun ulang sesuai urutan file di ZIP (worker paralel bisa selesai tidak berurutan)
+    parts = partition_frames(partial)
+    order = sorted(range(len(parts)), key=lambda p: int(parts[p][2].attrs['fingerprint'].rsplit('#', 1)[1]))
+    if order == list(range(len(parts))):
+        return partial
+    return concat_partitions([parts[p][2] for p in order])
+
+
+def _run(job, zip_path, is_temp, max_workers):
+    members = job['members']
+    cancel = job['cancel']
+    try:
+        workers = min(len(members), max_workers or os.cpu_count() or 1)
+        if workers > 1:
+            pool = ProcessPoolExecutor(max_workers=workers)
+            try:
+                futures = {pool.submit(parse_member, zip_path, m, None, False): i for i, m in enumerate(members)}
+                pending = set(futures)
+                while pending and not cancel.is_set():
+                    done, pending = wait(pending, timeout=POLL_SECONDS, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        _add_result(job, futures[future], future.result())
+            finally:
+                pool.shutdown(wait=not cancel.is_set(), cancel_futures=True)
+        else:
+            for i, member in enumerate(members):
+                if cancel.is_set():
+                    break
+                _add_result(job, i, parse_member(zip_path, member))
+
+        if cancel.is_set():
+            with _jobs_lock:
+                job.update(status='cancelled', results={}, pending={}, partial=None)
+            return
+        with job['merge_lock']:
+            partial = _absorb(job)
+        df = normalize_export(pd.DataFrame()) if partial is None else _ordered(partial)
+        stats = _job_stats(job)
+        if not stats['errors']:
+            store(job['digest'], df, stats)
+        set_fingerprint(df, job['digest'])
+        # Cube statistik dibangun sekali di akhir ingest, sebelum dashboard pertama kali memintanya
+        get_cube(df)
+        publish(job['digest'], df, job['name'])
+        with _jobs_lock:
+            # Frame final dimiliki registry; job hanya menahannya kalau tidak bisa dimuat ulang dari cache
+            job.update(status='done', df=df if stats['errors'] else None,
+                       stats={**stats, 'cache': 'miss', 'parsed': len(members)}, results={}, pending={}, partial=None)
+    except Exception as e:
+        with _jobs_lock:
+            job.update(status='error', error=str(e), results={}, pending={}, partial=None)
+    finally:
+        if is_temp:
+            os.unlink(zip_path)
+
+
+def job_progress(job):
+    with _jobs_lock:
+        if job['status'] == 'done':
+            return {'status': 'done', 'parsed': job['stats']['parsed'], 'members': job['stats']['members'],
+                    'rows': job['stats']['rows']}
+        results = list(job['results'].values())
+        return {
+            'status': job['status'],
+            'parsed': len(results),
+            'members': len(job['members']),
+            'rows': sum(rows for _, rows, _, _ in results),
+            'error': job['error'],
+        }
+
+
+def _final_frame(job):
+    if job['df'] is not None:
+        return job['df']
+    cached = load(job['digest'])
+    if cached is None:
+        return None
+    df = cached[0]
+    df.attrs['normalized'] = True
+    return set_fingerprint(df, job['digest'])
+
+
+def job_frame(job, session=None):
+    # Job yang belum selesai: gabungan file CSV yang sudah terbaca, urut sesuai waktu selesai dibaca
+    with _jobs_lock:
+        done = job['status'] == 'done'
+    if done:
+        # Dataset final diambil dari registry bersama; kalau sudah tersingkir dimuat ulang dari cache export
+        df = acquire(job['digest'], lambda: _final_frame(job), session, job['name'])
+        if df is None:
+            with _jobs_lock:
+                job['status'] = 'evicted'
+            return pd.DataFrame(), job['stats']
+        return df, job['stats']
+    with job['merge_lock']:
+        df = _absorb(job)
+    if df is None:
+        df = pd.DataFrame()
+    stats = _job_stats(job)
+    return df, {**stats, 'rows': len(df), 'cache': 'partial', 'parsed': len(job['results'])}
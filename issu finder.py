@@ -1,41 +1,24 @@
+import time
+
 import streamlit as st
-import pandas as pd
-import zipfile
-import urllib.request
-import os
-import io
-from collections import Counter
-import re
+
+from downloader import download_zip
+from cube import filter_stats
+from dashboard_panels import (cluster_sidebar, download_progress, facet_caption, filter_sidebar, filter_state, init_filter_state,
+                              session_digest, stats_sidebar, term_tables, wordcloud_panel, wordcloud_sidebar)
+from dataset_registry import release
+from engine import SCHEMAS, decorate, run_query
+from ingest import normalize_export
+from ingest_jobs import cancel_ingest, get_job, job_frame, start_ingest
+from profiler import begin_run, finish_run, stage
+from summary_export import export_key, frame_chunks, row_chunks
+from table_view import download_panel, ingest_status, performance_panel, registry_panel, summary_page
 
 st.set_page_config(layout="wide")
 st.title("📰 Topic Summary NoLimit Dashboard")
 
-@st.cache_data(show_spinner=False)
-def extract_csv_from_zip(zip_file):
-    with zipfile.ZipFile(zip_file, 'r') as zip_ref:
-        csv_files = [f for f in zip_ref.namelist() if f.endswith('.csv')]
-        if not csv_files:
-            st.error("❌ Tidak ada file .csv dalam ZIP.")
-            return []
-        dfs = []
-        for f in csv_files:
-            with zip_ref.open(f) as file:
-                try:
-                    df = pd.read_csv(file, delimiter=';', quotechar='"', on_bad_lines='skip', engine='python')
-                    dfs.append(df)
-                except Exception as e:
-                    st.warning(f"Gagal membaca {f}: {e}")
-        return pd.concat(dfs, ignore_index=True) if dfs else pd.DataFrame()
-
-if 'show_wordcloud' not in st.session_state:
-    st.session_state['show_wordcloud'] = False
-if 'dynamic_wordcloud' not in st.session_state:
-    st.session_state['dynamic_wordcloud'] = True
-if 'reset_filter' not in st.session_state:
-    st.session_state['sentiment_filter'] = "All"
-    st.session_state['label_filter'] = "All"
-    st.session_state['keyword_input'] = ""
-    st.session_state['highlight_words'] = ""
+perf_panel = st.sidebar.checkbox("⏱️ Performance", key='perf_panel', help="Waktu, baris dan memori tiap tahap per rerun")
+begin_run(perf_panel, app='issu finder')
 
 st.markdown("### 📁 Pilih sumber data")
 input_type = st.radio("Input ZIP via:", ["Upload File", "Link Download"])
@@ -50,148 +33,84 @@ else:
     if st.button("Proceed"):
         if zip_url:
             try:
-                tmp_path = "/tmp/downloaded.zip"
-                urllib.request.urlretrieve(zip_url, tmp_path)
-                zip_data = tmp_path
+                zip_data = download_zip(zip_url, progress=download_progress(st.progress(0.0, text="⬇️ Mengunduh ZIP...")))
             except Exception as e:
                 st.error(f"❌ Gagal mengunduh: {e}")
 
-if 'last_df' not in st.session_state:
-    st.session_state['last_df'] = None
-
+# Ingest jalan di background per digest; dataset terakhir tetap tampil walau file upload dihapus
 if zip_data:
-    with st.spinner("Membaca dan memproses data..."):
-        df = extract_csv_from_zip(zip_data)
-        if not df.empty:
-            st.session_state['last_df'] = df.copy()
-
-if st.session_state['last_df'] is not None:
-    df = st.session_state['last_df']
+    digest = session_digest(zip_data)
+    previous = st.session_state.get('ingest_digest')
+    if previous and previous != digest:
+        cancel_ingest(previous)
+        release()
+    st.session_state['ingest_digest'] = digest
+    if input_type == "Link Download" or st.session_state.get('ingest_cancelled') != digest:
+        st.session_state.pop('ingest_cancelled', None)
+        with st.spinner("Menyiapkan ZIP..."):
+            start_ingest(digest, zip_data)
+
+df = None
+job = get_job(st.session_state['ingest_digest']) if st.session_state.get('ingest_digest') else None
+if job is not None:
+    progress = ingest_status(job)
+    if progress['status'] in ('running', 'done'):
+        with stage('load_zip') as record:
+            df, stats = job_frame(job)
+            record.update(rows_out=len(df), cache=stats['cache'])
+        if progress['status'] == 'done' and not stats['members']:
+            st.error("❌ Tidak ada file .csv dalam ZIP.")
+        for member, error in stats['errors']:
+            st.warning(f"Gagal membaca {member}: {error}")
+        if df.empty:
+            df = None
+        else:
+            cache_badge = {'hit': "⚡ cache hit", 'miss': "🐢 cache miss"}.get(stats['cache'], "⏳ ringkasan sementara")
+            st.caption(f"📄 {stats['parsed']}/{stats['members']} file CSV · {stats['rows']} baris · {stats['skipped_lines']} baris rusak dilewati · {cache_badge}")
+
+if df is not None:
     is_sosmed = 'tier' not in df.columns
 
     if is_sosmed:
-        for col in ['content', 'final_sentiment']:
-            df[col] = df[col].astype(str).str.strip("'")
-        df['label'] = df['label'].fillna('')
-        df['post_type'] = df['post_type'].fillna('')
-        df['object_group'] = df['object_group'].fillna('')
-        df['specific_resource'] = df['specific_resource'].fillna('')
-        df['url'] = df['url'].fillna('-')
-
-        all_labels = sorted(set([label.strip() for sub in df['label'] for label in sub.split(',') if label.strip()]))
-        sentiments_all = sorted(df['final_sentiment'].str.lower().unique())
-
-        # Filter Sidebar
-        with st.sidebar:
-            if st.button("🧹 Clear Filter"):
-                st.session_state['sentiment_filter'] = "All"
-                st.session_state['label_filter'] = "All"
-                st.session_state['keyword_input'] = ""
-                st.session_state['highlight_words'] = ""
-
-            sentiment_filter = st.selectbox("Sentimen", options=["All"] + sentiments_all, index=([
-                "All"] + sentiments_all).index(st.session_state['sentiment_filter']))
-            st.session_state['sentiment_filter'] = sentiment_filter
-
-            label_filter = st.selectbox("Label", options=["All"] + all_labels, index=([
-                "All"] + all_labels).index(st.session_state['label_filter']))
-            st.session_state['label_filter'] = label_filter
-
-            keyword_input = st.text_input("Kata kunci (\"frasa\" -exclude)", value=st.session_state['keyword_input'])
-            st.session_state['keyword_input'] = keyword_input
-
-            highlight_words = st.text_input("Highlight Kata", value=st.session_state['highlight_words'])
-            st.session_state['highlight_words'] = highlight_words
-
-            st.session_state['show_wordcloud'] = st.checkbox("Tampilkan WordCloud",
-                                                             value=st.session_state['show_wordcloud'])
-            if st.session_state['show_wordcloud']:
-                st.session_state['dynamic_wordcloud'] = st.checkbox("Word Cloud Dinamis",
-                                                                   value=st.session_state['dynamic_wordcloud'])
-
-        filtered_df = df.copy()
-        if sentiment_filter != 'All':
-            filtered_df = filtered_df[filtered_df['final_sentiment'].str.lower() == sentiment_filter]
-        if label_filter != 'All':
-            filtered_df = filtered_df[filtered_df['label'].apply(lambda x: label_filter in [s.strip() for s in x.split(',')])]
-
-        def parse_advanced_keywords(query):
-            query = query.strip()
-            if not query:
-                return [], [], []
-            include_groups, exclude_words, exact_phrases = [], [], []
-            token_pattern = r'\"[^\"]+\"|\([^\)]+\)|\S+'
-            tokens = re.findall(token_pattern, query)
-            for tok in tokens:
-                if tok.startswith('"') and tok.endswith('"'):
-                    exact_phrases.append(tok.strip('"'))
-                elif tok.startswith('-'):
-                    inner = tok[1:].strip()
-                    exclude_words.extend(inner.strip('()').split())
-                elif tok.startswith('(') and tok.endswith(')'):
-                    or_group = [w.strip() for w in tok.strip('()').split('OR') if w.strip()]
-                    include_groups.append(or_group)
-                else:
-                    include_groups.append([tok.strip()])
-            return include_groups, exact_phrases, exclude_words
-
-        def match_advanced(text, includes, phrases, excludes):
-            text = text.lower()
-            if any(word in text for word in excludes):
-                return False
-            for phrase in phrases:
-                if phrase.lower() not in text:
-                    return False
-            for group in includes:
-                if not any(word.lower() in text for word in group):
-                    return False
-            return True
-
-        includes, phrases, excludes = parse_advanced_keywords(keyword_input)
-        if keyword_input:
-            mask = filtered_df['content'].apply(lambda x: match_advanced(x, includes, phrases, excludes))
-            filtered_df = filtered_df[mask]
-
-        highlight_tokens = re.findall(r'\"[^\"]+\"|\S+', highlight_words)
-        highlight_words_set = set([h.strip('"').lower() for h in highlight_tokens])
-
-        def highlight_text(text):
-            for word in highlight_words_set:
-                text = re.sub(f"(?i)({re.escape(word)})", r'<mark>\1</mark>', text)
-            return text
-
-        # Sample link ambil dari salah satu baris untuk setiap content
-        grouped = filtered_df.groupby('content').agg(
-            Article=('content', 'count'),
-            Sentiment=('final_sentiment', lambda x: x.mode().iloc[0] if not x.mode().empty else '-'),
-            Link=('url', lambda x: x.dropna().iloc[0] if not x.dropna().empty else '-')
-        ).reset_index().sort_values(by='Article', ascending=False)
-
-        def sentiment_color(sent):
-            s = sent.lower()
-            if s == 'positive': return f'<span style="color:green;font-weight:bold">{s}</span>'
-            if s == 'negative': return f'<span style="color:red;font-weight:bold">{s}</span>'
-            if s == 'neutral': return f'<span style="color:gray;font-weight:bold">{s}</span>'
-            return sent
-
-        grouped['content'] = grouped['content'].apply(highlight_text)
-        grouped['Sentiment'] = grouped['Sentiment'].apply(sentiment_color)
-        grouped['Link'] = grouped['Link'].apply(lambda x: f'<a href="{x}" target="_blank">Link</a>' if x != '-' else '-')
+        df = normalize_export(df)
+
+        init_filter_state()
+
+        # Jumlah per opsi filter dari cube; nilai filter dibaca dari key widget sebelum widget digambar
+        stats = filter_stats(df, *filter_state())
+        filters = filter_sidebar('sosmed', stats['sentiment_options'], stats['label_options'])
+        cluster_threshold = cluster_sidebar()
+        wordcloud_sidebar()
+        stats_sidebar('sosmed', stats['rows'], stats['sentiments'], facet_caption('sosmed', stats), df)
+
+        with stage('query', len(df)) as record:
+            result = run_query(df, filters['sentiment'], filters['labels'], filters['label_mode'], filters['keyword'], cluster_threshold, filters['whole_words'])
+            record.update(rows_out=result['rows'], cache=result['cache'])
 
         st.markdown("### 📊 Ringkasan Percakapan")
+        page = summary_page(result['summary'], 'content')
+        with stage('highlight', len(page)):
+            grouped = decorate(page, 'content', filters['highlight'])
         st.markdown("<style>table { table-layout: fixed; width: 100%; word-wrap: break-word; }</style>", unsafe_allow_html=True)
-        st.markdown(grouped[['content', 'Article', 'Sentiment', 'Link']].to_html(escape=False, index=False), unsafe_allow_html=True)
-
-        if st.session_state['show_wordcloud']:
-            st.markdown("### ☁️ Word Cloud (Top 500)")
-            base_df = filtered_df if st.session_state['dynamic_wordcloud'] else df
-            all_text = ' '.join(base_df['content'].tolist())
-            tokens = re.findall(r'\b\w{3,}\b', all_text.lower())
-            stop_url = "https://raw.githubusercontent.com/stopwords-iso/stopwords-id/master/stopwords-id.txt"
-            common_stopwords = set(pd.read_csv(stop_url, header=None)[0].tolist())
-            tokens = [word for word in tokens if word not in common_stopwords]
-            word_freq = Counter(tokens).most_common(500)
-            wc_df = pd.DataFrame(word_freq, columns=['Kata', 'Jumlah'])
-            st.dataframe(wc_df, use_container_width=True)
+        with stage('html', len(grouped)):
+            table_html = grouped[['content', 'Article', 'Sentiment', 'Link']].to_html(escape=False, index=False)
+        st.markdown(table_html, unsafe_allow_html=True)
+        summary_columns = ['content', 'Article', 'Sentiment', 'Link']
+        download_panel(export_key(df, result['mask'], cluster_threshold), {
+            'ringkasan': ("Ringkasan percakapan", summary_columns, lambda: frame_chunks(result['summary'][summary_columns])),
+            'baris': ("Baris data", list(df.columns), lambda: row_chunks(df, result['mask'], list(df.columns))),
+        })
+
+        wordcloud_panel(len(df), lambda dynamic: term_tables(df, SCHEMAS['sosmed'], result['mask'] if dynamic else None))
 else:
     st.info("Silakan upload atau unduh ZIP untuk melihat ringkasan topik.")
+
+report = finish_run()
+if perf_panel:
+    performance_panel(report)
+    registry_panel()
+
+if job is not None and job['status'] == 'running':
+    # Muat ulang berkala selama ingest berjalan supaya ringkasan ikut bertambah
+    time.sleep(1)
+    st.rerun()
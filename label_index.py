@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+from ingest import dataset_artifact
+
+
+def split_labels(value):
+    return sorted(set(label.strip() for label in value.split(',') if label.strip()))
+
+
+def build_label_index(labels):
+    # Baris dengan string label yang sama berbagi satu baris multi-hot, jadi split hanya sekali per kombinasi
+    if not isinstance(labels.dtype, pd.CategoricalDtype):
+        labels = labels.fillna('').astype(str)
+    combo_codes, combos = pd.factorize(labels, use_na_sentinel=False)
+    combo_labels = [split_labels(combo) for combo in combos]
+    vocab = sorted(set(label for labels_ in combo_labels for label in labels_))
+    position = {label: i for i, label in enumerate(vocab)}
+    matrix = np.zeros((len(combos), len(vocab)), dtype=bool)
+    for i, labels_ in enumerate(combo_labels):
+        matrix[i, [position[label] for label in labels_]] = True
+    return {
+        'vocab': vocab,
+        'position': position,
+        'codes': combo_codes.astype(np.int32),
+        'combos': list(combos),
+        'matrix': matrix,
+    }
+
+
+def get_label_index(df, column='label'):
+    return dataset_artifact(df, f'label_index:{column}', lambda d: build_label_index(d[column]))
+
+
+def combos_matching(index, selected, match_all=False):
+    columns = [index['position'][label] for label in selected if label in index['position']]
+    if not columns:
+        return np.zeros(len(index['combos']), dtype=bool) if selected else np.ones(len(index['combos']), dtype=bool)
+    sub = index['matrix'][:, columns]
+    if match_all:
+        if len(columns) < len(selected):
+            return np.zeros(len(index['combos']), dtype=bool)
+        return sub.all(axis=1)
+    return sub.any(axis=1)
+
+
+def labels_mask(index, selected, match_all=False):
+    if not selected:
+        return np.ones(len(index['codes']), dtype=bool)
+    return combos_matching(index, selected, match_all)[index['codes']]
+
+
+def label_counts(index, mask=None):
+    codes = index['codes'] if mask is None else index['codes'][mask]
+    per_combo = np.bincount(codes, minlength=len(index['combos']))
+    return pd.Series(per_combo @ index['matrix'], index=index['vocab'], dtype=np.int64)
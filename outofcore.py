@@ -0,0 +1,413 @@
+import os
+import tempfile
+import threading
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pa_csv = None
+    pq = None
+
+from engine import SCHEMAS
+from ingest import (DELIMITER, QUOTECHAR, SOSMED_COLUMNS, TIER_COLUMNS, TIER_ORDER, _read_header, clean_column,
+                    invalid_row_handler, list_csv_members, parse_short_rows, spool_zip)
+from label_index import build_label_index, label_counts, labels_mask
+from search import build_index, match_fields, parse_scoped_keywords, query_index
+from topics import TIER_COLUMNS as TIER_COUNT_COLUMNS, tier_categorical
+from wordfreq import TOP_TERMS, _top_k, _totals, build_term_matrix
+
+SPILL_DIR = os.environ.get('NOLIMIT_SPILL_DIR', os.path.join(tempfile.gettempdir(), 'nolimit-spill'))
+SPILL_MAX_BYTES = int(os.environ.get('NOLIMIT_SPILL_MAX_BYTES', 16 * 1024 ** 3))
+# Spill terbuka menahan agregat topik/term di memori, jadi jumlahnya dibatasi; file yang tersingkir dibuang lebih dulu oleh evict_spills
+OPEN_SPILLS = int(os.environ.get('NOLIMIT_OPEN_SPILLS', 4))
+BLOCK_BYTES = 4 * 1024 * 1024
+ROW_GROUP_ROWS = 64 * 1024
+RESULT_CACHE_SIZE = 8
+# Link terbaik dikodekan rank_tier * 2^40 + nomor baris, jadi min() sekaligus memilih tier lalu baris paling awal
+LINK_SHIFT = 2 ** 40
+NO_LINK = np.iinfo(np.int64).max
+
+# Spill per digest dipakai bersama semua sesi, urut dari yang paling lama tidak dipakai
+_spills = OrderedDict()
+_building = {}
+_spills_lock = threading.Lock()
+
+
+def _empty_aggregates():
+    return {
+        'topics': pd.DataFrame(),
+        'sentiments': pd.Series(dtype=np.int64),
+        'labels': pd.Series(dtype=np.int64),
+        'terms': pd.Series(dtype=np.int64),
+        'bigrams': pd.Series(dtype=np.int64),
+        'rows': 0,
+        # Parsial per potongan yang belum digabung, lihat _push_partial
+        'pending': {'topics': [], 'terms': [], 'bigrams': []},
+    }
+
+
+def _add_counts(total, part):
+    return total.add(part, fill_value=0).astype(np.int64)
+
+
+def _merge_counts(parts):
+    return pd.concat(parts).groupby(level=0, sort=False).sum().astype(np.int64)
+
+
+def _chunk_topics(chunk, rows, schema):
+    key, sentiment_col, tier_col = schema['key'], schema['sentiment'], schema['tier']
+    frame = pd.DataFrame({
+        'h': pd.util.hash_array(chunk[key].to_numpy(dtype=object)),
+        'row': rows,
+        'sent': chunk[sentiment_col].to_numpy(dtype=object),
+    })
+    groups = frame.groupby('h', sort=False)
+    topics = pd.DataFrame({'Article': groups.size(), 'first_row': groups['row'].min()})
+    sentiments = frame.groupby(['h', 'sent'], sort=False).size().unstack(fill_value=0)
+    topics = topics.join(sentiments.add_prefix('sent:'))
+    if tier_col:
+        rank = tier_categorical(chunk[tier_col], TIER_ORDER).codes.astype(np.int64)
+        frame['link'] = np.where(rank >= 0, rank * LINK_SHIFT + rows, NO_LINK)
+        frame['tier'] = tier_categorical(chunk[tier_col], TIER_COUNT_COLUMNS)
+        tiers = frame.groupby(['h', 'tier'], observed=False).size().unstack(fill_value=0)
+        topics = topics.join(frame.groupby('h')['link'].min()).join(tiers.add_prefix('tier:'))
+    else:
+        topics['link'] = topics['first_row']
+    return topics
+
+
+def _merge_topics(parts):
+    merged = pd.concat(parts)
+    spec = {c: ('min' if c in ('first_row', 'link') else 'sum') for c in merged.columns}
+    merged = merged.groupby(level=0, sort=False).agg(spec)
+    counts = [c for c in merged.columns if c.startswith(('sent:', 'tier:'))]
+    merged[counts] = merged[counts].fillna(0).astype(np.int64)
+    return merged
+
+
+MERGES = {'topics': _merge_topics, 'terms': _merge_counts, 'bigrams': _merge_counts}
+
+
+def _push_partial(agg, name, part):
+    # Digabung bertingkat seperti merge sort: tiap baris ikut digabung O(log potongan) kali, bukan sekali per potongan
+    stack = agg['pending'][name]
+    level = 0
+    while stack and stack[-1][0] == level:
+        part = MERGES[name]([stack.pop()[1], part])
+        level += 1
+    stack.append((level, part))
+
+
+def _finish_aggregates(agg):
+    for name, stack in agg.pop('pending').items():
+        if stack:
+            agg[name] = MERGES[name]([part for _, part in stack])
+    return agg
+
+
+def _chunk_mask(chunk, schema, sentiment, labels, label_mode, clauses, whole_words=False):
+    mask = np.ones(len(chunk), dtype=bool)
+    if sentiment != 'All':
+        mask &= (chunk[schema['sentiment']].str.lower() == sentiment).to_numpy()
+    if labels:
+        mask &= labels_mask(build_label_index(chunk['label']), labels, match_all=label_mode == 'AND')
+    if any(any(c) for c in clauses.values()) and mask.any():
+        # Indeks kolom dibangun hanya kalau kolom itu memang perlu dipindai (body dilewati kalau title sudah cocok)
+        indexes = {}
+        def match(field, clause, base):
+            if field not in indexes:
+                indexes[field] = build_index(chunk[field])
+            return query_index(indexes[field], *clause, base=base, whole_words=whole_words)
+        mask = match_fields(schema['text'], clauses, match, mask)
+    return mask
+
+
+def _aggregate_chunk(agg, chunk, start, schema, mask=None, terms=True):
+    # Agregat parsial per potongan baris; semua bisa digabung (jumlah/min) jadi memori hanya sebesar jumlah topik
+    rows = np.arange(start, start + len(chunk), dtype=np.int64)
+    if mask is not None:
+        chunk, rows = chunk[mask], rows[mask]
+    if not len(chunk):
+        return agg
+    agg['rows'] += len(chunk)
+    _push_partial(agg, 'topics', _chunk_topics(chunk, rows, schema))
+    agg['sentiments'] = _add_counts(agg['sentiments'], chunk[schema['sentiment']].str.lower().value_counts())
+    agg['labels'] = _add_counts(agg['labels'], label_counts(build_label_index(chunk['label'])))
+    if terms:
+        texts = chunk[schema['text'][0]]
+        for column in schema['text'][1:]:
+            texts = texts + ' ' + chunk[column]
+        matrix = build_term_matrix(texts)
+        for name, counts, vocab in (('terms', 'unigrams', 'vocab'), ('bigrams', 'bigrams', 'bigram_vocab')):
+            totals = pd.Series(_totals(matrix[counts], None), index=matrix[vocab])
+            _push_partial(agg, name, totals[totals > 0])
+    return agg
+
+
+def _spill_schema(zip_ref, members):
+    header = _read_header(zip_ref, members[0]) if members else []
+    name = 'tier' if 'tier' in header else 'sosmed'
+    return name, TIER_COLUMNS if name == 'tier' else SOSMED_COLUMNS
+
+
+def _member_frames(reader, header, usecols, short_rows):
+    # Baris pendek baru diketahui setelah file habis dibaca, jadi ditulis sebagai potongan terakhir file itu
+    for batch in reader:
+        yield batch.to_pandas()
+    if short_rows:
+        yield parse_short_rows(header, short_rows, usecols)
+
+
+def _clean_chunk(df, columns):
+    return pd.DataFrame({
+        col: clean_column(df[col] if col in df.columns else pd.Series([None] * len(df), dtype=object), col)
+        .astype(object)
+        for col in columns
+    })
+
+
+def build_spill(digest, zip_file, progress=None, spill_dir=None):
+    # Satu lintasan streaming: tiap blok CSV dibersihkan, ditulis ke spill Parquet lalu dilipat ke agregat
+    if pq is None:
+        raise RuntimeError("pyarrow diperlukan untuk mode out-of-core")
+    spill_dir = spill_dir or SPILL_DIR
+    os.makedirs(spill_dir, exist_ok=True)
+    path = os.path.join(spill_dir, f'{digest}.parquet')
+    fd, tmp_path = tempfile.mkstemp(dir=spill_dir, suffix='.tmp')
+    os.close(fd)
+    zip_path, is_temp = spool_zip(zip_file)
+    agg = _empty_aggregates()
+    skipped = []
+    errors = []
+    written = 0
+    try:
+        members = list_csv_members(zip_path)
+        with zipfile.ZipFile(zip_path) as zip_ref:
+            schema_name, columns = _spill_schema(zip_ref, members)
+            schema = SCHEMAS[schema_name]
+            arrow_schema = pa.schema([(c, pa.string()) for c in columns])
+            with pq.ParquetWriter(tmp_path, arrow_schema) as writer:
+                for i, member in enumerate(members):
+                    try:
+                        header = _read_header(zip_ref, member)
+                        usecols = [c for c in header if c in columns]
+                        short_rows = []
+                        with zip_ref.open(member) as file:
+                            reader = pa_csv.open_csv(
+                                file,
+                                read_options=pa_csv.ReadOptions(block_size=BLOCK_BYTES),
+                                parse_options=pa_csv.ParseOptions(
+                                    delimiter=DELIMITER, quote_char=QUOTECHAR,
+                                    newlines_in_values=True, invalid_row_handler=invalid_row_handler(short_rows, skipped),
+                                ),
+                                convert_options=pa_csv.ConvertOptions(
+                                    include_columns=usecols,
+                                    column_types={c: pa.string() for c in usecols},
+                                    strings_can_be_null=True,
+                                ),
+                            )
+                            for frame in _member_frames(reader, header, usecols, short_rows):
+                                chunk = _clean_chunk(frame, columns)
+                                writer.write_table(pa.Table.from_pandas(chunk, schema=arrow_schema, preserve_index=False),
+                                                   row_group_size=ROW_GROUP_ROWS)
+                                agg = _aggregate_chunk(agg, chunk, written, schema)
+                                written += len(chunk)
+                    except (OSError, ValueError, pa.ArrowException) as e:
+                        errors.append((member, str(e)))
+                    if progress:
+                        progress(i + 1, len(members), written)
+        os.replace(tmp_path, path)
+    finally:
+        if is_temp:
+            os.unlink(zip_path)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    metadata = pq.ParquetFile(path).metadata
+    sizes = [metadata.row_group(g).num_rows for g in range(metadata.num_row_groups)]
+    return {
+        'digest': digest,
+        'path': path,
+        'schema': schema_name,
+        'columns': columns,
+        'starts': np.cumsum([0] + sizes)[:-1],
+        'sizes': sizes,
+        'stats': {'members': len(members), 'rows': written, 'skipped_lines': len(skipped), 'errors': errors},
+        'aggregates': _finish_aggregates(agg),
+        'results': OrderedDict(),
+        'lock': threading.Lock(),
+    }
+
+
+def open_spill(digest, zip_file, progress=None):
+    with _spills_lock:
+        if digest in _spills:
+            _spills.move_to_end(digest)
+            return _spills[digest]
+        future = _building.get(digest)
+        owner = future is None
+        if owner:
+            future = Future()
+            _building[digest] = future
+    if not owner:
+        # ZIP yang sama sedang ditulis ke spill oleh sesi lain, tunggu hasilnya saja
+        return future.result()
+    try:
+        spill = build_spill(digest, zip_file, progress)
+        with _spills_lock:
+            _spills[digest] = spill
+            while len(_spills) > OPEN_SPILLS:
+                _spills.popitem(last=False)
+        evict_spills(keep=digest)
+        future.set_result(spill)
+        return spill
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _spills_lock:
+            _building.pop(digest, None)
+
+
+def get_spill(digest):
+    with _spills_lock:
+        if digest in _spills:
+            _spills.move_to_end(digest)
+        return _spills.get(digest)
+
+
+def evict_spills(max_bytes=None, keep=None):
+    # File sisa proses sebelumnya dibuang lebih dulu, lalu spill yang paling lama tidak dipakai
+    max_bytes = SPILL_MAX_BYTES if max_bytes is None else max_bytes
+    if not os.path.isdir(SPILL_DIR):
+        return []
+    with _spills_lock:
+        used = {os.path.basename(spill['path']): i for i, spill in enumerate(_spills.values())}
+    entries = []
+    for name in os.listdir(SPILL_DIR):
+        if name.endswith('.parquet'):
+            # Proses lain bisa membuang file yang sama di antara listdir dan stat/remove
+            try:
+                st = os.stat(os.path.join(SPILL_DIR, name))
+            except FileNotFoundError:
+                continue
+            entries.append((name in used, used.get(name, 0), st.st_mtime, st.st_size, name))
+    entries.sort()
+    total = sum(size for _, _, _, size, _ in entries)
+    removed = []
+    for _, _, _, size, name in entries:
+        if total <= max_bytes:
+            break
+        if name == f'{keep}.parquet':
+            continue
+        with _spills_lock:
+            _spills.pop(name[:-len('.parquet')], None)
+        try:
+            os.remove(os.path.join(SPILL_DIR, name))
+        except FileNotFoundError:
+            continue
+        total -= size
+        removed.append(name)
+    return removed
+
+
+def iter_spill(spill, columns=None):
+    parquet = pq.ParquetFile(spill['path'])
+    for group, start in enumerate(spill['starts']):
+        yield int(start), parquet.read_row_group(group, columns=columns).to_pandas()
+
+
+def query_spill(spill, sentiment='All', labels=(), label_mode='OR', query='', terms=False, whole_words=False):
+    # Filter dijalankan ulang per row group spill; hasil disimpan LRU kecil per kombinasi filter
+    schema = SCHEMAS[spill['schema']]
+    clauses = parse_scoped_keywords(query, schema['text'])
+    if sentiment == 'All' and not labels and not any(any(c) for c in clauses.values()):
+        return spill['aggregates']
+    key = (sentiment, tuple(sorted(labels)), label_mode if len(labels) > 1 else 'OR', query, terms, whole_words)
+    with spill['lock']:
+        if key in spill['results']:
+            spill['results'].move_to_end(key)
+            return spill['results'][key]
+    agg = _empty_aggregates()
+    for start, chunk in iter_spill(spill):
+        mask = _chunk_mask(chunk, schema, sentiment, labels, label_mode, clauses, whole_words)
+        agg = _aggregate_chunk(agg, chunk, start, schema, mask, terms)
+    agg = _finish_aggregates(agg)
+    with spill['lock']:
+        spill['results'][key] = agg
+        while len(spill['results']) > RESULT_CACHE_SIZE:
+            spill['results'].popitem(last=False)
+    return agg
+
+
+def topic_summary(agg, tier=False):
+    topics = agg['topics']
+    if topics.empty:
+        columns = ['row', 'Article', 'Sentiment', 'link_row'] + (TIER_COUNT_COLUMNS if tier else [])
+        return pd.DataFrame(columns=columns)
+    # Modus sentimen: kolom diurutkan alfabetis sehingga seri jatuh ke nilai terkecil, sama seperti modal_value
+    sentiment_cols = sorted(c for c in topics.columns if c.startswith('sent:'))
+    labels = np.array([c[len('sent:'):] for c in sentiment_cols], dtype=object)
+    link = topics['link'].to_numpy()
+    summary = pd.DataFrame({
+        'row': topics['first_row'].to_numpy(),
+        'Article': topics['Article'].to_numpy(),
+        'Sentiment': labels[topics[sentiment_cols].to_numpy().argmax(axis=1)],
+        'link_row': np.where(link == NO_LINK, -1, link % LINK_SHIFT),
+    })
+    if tier:
+        for col in TIER_COUNT_COLUMNS:
+            summary[col] = topics[f'tier:{col}'].to_numpy() if f'tier:{col}' in topics.columns else 0
+    return summary.sort_values(['Article', 'row'], ascending=[False, True], kind='stable').reset_index(drop=True)
+
+
+def fetch_rows(spill, rows, columns):
+    # Baca hanya row group yang memuat baris yang diminta, hanya kolom yang diminta
+    rows = np.asarray(rows, dtype=np.int64)
+    out = pd.DataFrame(index=range(len(rows)), columns=columns, dtype=object)
+    valid = rows >= 0
+    if not valid.any():
+        return out
+    groups = np.searchsorted(spill['starts'], rows[valid], side='right') - 1
+    positions = np.flatnonzero(valid)
+    parquet = pq.ParquetFile(spill['path'])
+    for group in np.unique(groups):
+        table = parquet.read_row_group(int(group), columns=columns)
+        picked = positions[groups == group]
+        local = rows[picked] - spill['starts'][group]
+        out.iloc[picked] = table.take(pa.array(local)).to_pandas().to_numpy()
+    return out
+
+
+def resolve_page(spill, page):
+    # Teks topik dan URL hanya diambil untuk baris yang tampil di halaman
+    key = SCHEMAS[spill['schema']]['key']
+    text = fetch_rows(spill, page['row'].to_numpy(), [key])[key].to_numpy()
+    urls = fetch_rows(spill, page['link_row'].to_numpy(), ['url'])['url'].fillna('-').to_numpy()
+    return page.drop(columns=['row', 'link_row']).assign(**{key: text, 'Link': urls})
+
+
+def summary_chunks(spill, summary, chunk_rows=ROW_GROUP_ROWS):
+    for start in range(0, len(summary), chunk_rows):
+        yield resolve_page(spill, summary.iloc[start:start + chunk_rows])
+
+
+def row_chunks(spill, sentiment='All', labels=(), label_mode='OR', query='', whole_words=False):
+    # Baris asli yang lolos filter, dibaca ulang per row group spill
+    schema = SCHEMAS[spill['schema']]
+    clauses = parse_scoped_keywords(query, schema['text'])
+    for _, chunk in iter_spill(spill):
+        yield chunk[_chunk_mask(chunk, schema, sentiment, labels, label_mode, clauses, whole_words)]
+
+
+def top_counts(counts, columns, k=TOP_TERMS):
+    return _top_k(counts.to_numpy(), counts.index.to_numpy(dtype=object), k, columns)
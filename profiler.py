@@ -0,0 +1,104 @@
+import contextlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+LOG_ENV = 'NOLIMIT_PERF_LOG'
+
+logger = logging.getLogger('nolimit.perf')
+if not logger.handlers:
+    _handler = logging.StreamHandler(sys.stderr)
+    _handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+# Satu run per rerun Streamlit; tiap sesi berjalan di thread sendiri
+_local = threading.local()
+
+
+def _rss_bytes():
+    # RSS saat ini (Linux); memori diukur per proses, bukan lewat tracemalloc yang memperlambat semua sesi
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _max_rss_bytes():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _mb(after, before):
+    return None if after is None or before is None else round((after - before) / 1024 ** 2, 2)
+
+
+def begin_run(panel=False, **context):
+    # Tanpa panel dan tanpa NOLIMIT_PERF_LOG semua stage() jadi no-op
+    if not (panel or os.environ.get(LOG_ENV)):
+        _local.run = None
+        return None
+    run = {
+        'context': context,
+        'stages': [],
+        'stack': [],
+        'memory': panel,
+        'started': time.perf_counter(),
+    }
+    _local.run = run
+    return run
+
+
+def current_run():
+    return getattr(_local, 'run', None)
+
+
+@contextlib.contextmanager
+def stage(name, rows_in=None):
+    run = current_run()
+    if run is None:
+        yield {}
+        return
+    record = {'stage': name, 'depth': len(run['stack']), 'rows_in': rows_in}
+    if run['memory']:
+        record['_rss'] = _rss_bytes()
+        record['_max_rss'] = _max_rss_bytes()
+    run['stages'].append(record)
+    run['stack'].append(record)
+    started = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record['seconds'] = round(time.perf_counter() - started, 4)
+        run['stack'].pop()
+        if run['memory']:
+            # Angka proses (semua sesi): perubahan RSS dan kenaikan puncak RSS selama stage berjalan
+            record['rss_mb'] = _mb(_rss_bytes(), record.pop('_rss'))
+            record['peak_mb'] = _mb(_max_rss_bytes(), record.pop('_max_rss'))
+
+
+def finish_run():
+    run = current_run()
+    _local.run = None
+    if run is None:
+        return None
+    report = {
+        **run['context'],
+        'ts': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'seconds': round(time.perf_counter() - run['started'], 4),
+        'stages': run['stages'],
+    }
+    logger.info(json.dumps(report, default=str))
+    return report
@@ -0,0 +1,253 @@
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:
+    pa = None
+    pc = None
+
+from ingest import dataset_artifact, partition_frames
+
+TOKEN_PATTERN = r'\w+'
+# Pemisah token versi RE2 (pyarrow); sama dengan \w+ Python: huruf, angka dan garis bawah Unicode
+TOKEN_SEPARATOR = r'[^\p{L}\p{N}_]+'
+TERM_CACHE_SIZE = 64
+TOKENIZE_ROWS = 16_384
+
+
+def parse_advanced_keywords(query):
+    query = query.strip()
+    if not query:
+        return [], [], []
+    include_groups, exclude_words, exact_phrases = [], [], []
+    token_pattern = r'\"[^\"]+\"|\([^\)]+\)|\S+'
+    tokens = re.findall(token_pattern, query)
+    for tok in tokens:
+        if tok.startswith('"') and tok.endswith('"'):
+            exact_phrases.append(tok.strip('"'))
+        elif tok.startswith('-'):
+            inner = tok[1:].strip()
+            exclude_words.extend(inner.strip('()').split())
+        elif tok.startswith('(') and tok.endswith(')'):
+            or_group = [w.strip() for w in tok.strip('()').split('OR') if w.strip()]
+            include_groups.append(or_group)
+        else:
+            include_groups.append([tok.strip()])
+    return include_groups, exact_phrases, exclude_words
+
+
+def parse_scoped_keywords(query, fields):
+    # "title:kata", "-body:kata", "body:\"frasa\"" atau "title:(a OR b)" hanya berlaku di kolom itu; sisanya di kolom mana saja
+    tokens = re.findall(r'-?\w+:(?:\"[^\"]+\"|\([^\)]+\)|\S+)|\"[^\"]+\"|\([^\)]+\)|\S+', query.strip())
+    scoped = {}
+    plain = []
+    for tok in tokens:
+        match = re.match(r'(-?)(\w+):(.+)', tok)
+        if match and match.group(2) in fields:
+            scoped.setdefault(match.group(2), []).append(match.group(1) + match.group(3))
+        else:
+            plain.append(tok)
+    clauses = {None: parse_advanced_keywords(' '.join(plain))}
+    for field, parts in scoped.items():
+        clauses[field] = parse_advanced_keywords(' '.join(parts))
+    return clauses
+
+
+def _chunk_tokens(texts, min_length):
+    # Token satu potongan baris: (baris lokal, kode lokal, kosakata potongan), urut sesuai kemunculan
+    if pa is None:
+        tokens = texts.str.lower().str.findall(TOKEN_PATTERN).explode().dropna()
+        tokens = tokens[tokens.str.len() >= min_length]
+        codes, vocab = pd.factorize(tokens.to_numpy(dtype=object))
+        return tokens.index.to_numpy() - texts.index[0], codes, np.asarray(vocab, dtype=object)
+    texts = pa.array(texts, type=pa.large_string())
+    if isinstance(texts, pa.ChunkedArray):
+        texts = texts.combine_chunks()
+    parts = pc.split_pattern_regex(pc.utf8_lower(texts), TOKEN_SEPARATOR)
+    flat, parents = pc.list_flatten(parts), pc.list_parent_indices(parts)
+    keep = pc.greater_equal(pc.utf8_length(flat), min_length)
+    encoded = pc.dictionary_encode(flat.filter(keep))
+    return parents.filter(keep).to_numpy(), encoded.indices.to_numpy(), encoded.dictionary
+
+
+def token_codes(texts, min_length=1, unique=False, chunk_rows=TOKENIZE_ROWS):
+    # Token \w+ huruf kecil (minimal min_length huruf) sebagai kode integer per baris, diproses per potongan baris
+    # supaya tidak ada satu objek Python per token. unique=True: satu entri per (token, baris), urut per token lalu baris.
+    lower = texts.fillna('').astype(str).reset_index(drop=True)
+    rows, codes, vocabs = [], [], []
+    offset = 0
+    for start in range(0, len(lower), chunk_rows):
+        chunk = lower.iloc[start:start + chunk_rows]
+        local_rows, local_codes, vocab = _chunk_tokens(chunk, min_length)
+        if unique:
+            keys = np.sort(local_codes.astype(np.int64) * len(chunk) + local_rows)
+            keys = keys[np.append(True, keys[1:] != keys[:-1])]
+            local_codes, local_rows = keys // len(chunk), keys % len(chunk)
+        rows.append((local_rows + start).astype(np.int32))
+        codes.append((local_codes + offset).astype(np.int32))
+        vocabs.append(vocab)
+        offset += len(vocab)
+    if not vocabs:
+        return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int32), np.zeros(0, dtype=object)
+    # Kosakata tiap potongan digabung jadi kode global, urut kemunculan pertama seperti pd.factorize
+    if pa is None:
+        mapping, vocab = pd.factorize(np.concatenate(vocabs))
+    else:
+        merged = pc.dictionary_encode(pa.chunked_array(vocabs, type=pa.large_string()).combine_chunks())
+        mapping, vocab = merged.indices.to_numpy(), merged.dictionary.to_numpy(zero_copy_only=False)
+    rows, codes = np.concatenate(rows), mapping[np.concatenate(codes)].astype(np.int32)
+    if unique and len(vocabs) > 1:
+        order = np.argsort(codes, kind='stable')
+        rows, codes = rows[order], codes[order]
+    return rows, codes, np.asarray(vocab, dtype=object)
+
+
+def build_index(texts):
+    lower = texts.fillna('').astype(str).str.lower().reset_index(drop=True)
+    # satu posting per (token, baris), urut per token
+    rows, codes, vocab = token_codes(lower, unique=True)
+    return {
+        'n_rows': len(lower),
+        'lower': lower,
+        'vocab': pd.Series(vocab, dtype=str),
+        'codes': codes,
+        'postings': rows,
+        'offsets': np.searchsorted(codes, np.arange(len(vocab) + 1)),
+        'term_cache': OrderedDict(),
+        'term_lock': threading.Lock(),
+    }
+
+
+def get_index(df, column):
+    return dataset_artifact(df, f'token_index:{column}', lambda d: build_index(d[column]))
+
+
+def _token_mask(index, part, whole_words=False):
+    if whole_words:
+        # Kata utuh: hanya token yang sama persis, dicari lewat hash kosakata
+        with index['term_lock']:
+            if 'vocab_index' not in index:
+                index['vocab_index'] = pd.Index(index['vocab'])
+        hits = index['vocab_index'].get_indexer([part])
+        hits = hits[hits >= 0]
+    else:
+        # Substring: semua token kosakata yang memuat `part`
+        hits = np.flatnonzero(index['vocab'].str.contains(part, regex=False).to_numpy())
+    mask = np.zeros(index['n_rows'], dtype=bool)
+    offsets, postings = index['offsets'], index['postings']
+    if len(hits) <= 64:
+        for h in hits:
+            mask[postings[offsets[h]:offsets[h + 1]]] = True
+    else:
+        selected = np.zeros(len(offsets) - 1, dtype=bool)
+        selected[hits] = True
+        mask[postings[selected[index['codes']]]] = True
+    return mask
+
+
+def _term_candidates(index, term, whole_words=False):
+    cache = index['term_cache']
+    with index['term_lock']:
+        if (term, whole_words) in cache:
+            cache.move_to_end((term, whole_words))
+            bits, exact = cache[(term, whole_words)]
+            return np.unpackbits(bits, count=index['n_rows']).astype(bool), exact
+    parts = re.findall(TOKEN_PATTERN, term)
+    mask = np.ones(index['n_rows'], dtype=bool)
+    for part in parts:
+        mask &= _token_mask(index, part, whole_words)
+        if not mask.any():
+            break
+    # Hanya term satu token yang pasti tepat; sisanya masih kandidat yang perlu diverifikasi
+    exact = parts == [term]
+    with index['term_lock']:
+        cache[(term, whole_words)] = (np.packbits(mask), exact)
+        while len(cache) > TERM_CACHE_SIZE:
+            cache.popitem(last=False)
+    return mask, exact
+
+
+def _verify(index, rows, term, whole_words=False):
+    if not len(rows):
+        return rows
+    texts = index['lower'].iloc[rows]
+    if whole_words:
+        # Satu regex terkompilasi per term; batas kata sama dengan pola token \w+
+        pattern = re.compile(r'(?<!\w)' + re.escape(term) + r'(?!\w)')
+        return rows[texts.str.contains(pattern).to_numpy()]
+    return rows[texts.str.contains(term, regex=False).to_numpy()]
+
+
+def query_index(index, includes, phrases, excludes, base=None, whole_words=False):
+    mask = np.ones(index['n_rows'], dtype=bool) if base is None else base.copy()
+    pending_groups = []
+    for group in includes + [[phrase] for phrase in phrases]:
+        terms = [t.lower() for t in group]
+        candidates = [_term_candidates(index, t, whole_words) for t in terms]
+        group_mask = np.zeros(index['n_rows'], dtype=bool)
+        for cand, _ in candidates:
+            group_mask |= cand
+        mask &= group_mask
+        if not all(exact for _, exact in candidates):
+            pending_groups.append(list(zip(terms, candidates)))
+
+    pending_excludes = []
+    for word in excludes:
+        term = word.lower()
+        cand, exact = _term_candidates(index, term, whole_words)
+        if exact:
+            mask &= ~cand
+        else:
+            pending_excludes.append((term, cand))
+
+    # Verifikasi substring hanya untuk baris yang lolos operasi himpunan
+    for group in pending_groups:
+        group_ok = np.zeros(index['n_rows'], dtype=bool)
+        for term, (cand, exact) in group:
+            rows = np.flatnonzero(mask & cand & ~group_ok)
+            group_ok[rows if exact else _verify(index, rows, term, whole_words)] = True
+        mask &= group_ok
+    for term, cand in pending_excludes:
+        mask[_verify(index, np.flatnonzero(mask & cand), term, whole_words)] = False
+    return mask
+
+
+def field_mask(df, column, includes, phrases, excludes, base=None, whole_words=False):
+    parts = partition_frames(df)
+    if len(parts) == 1:
+        return query_index(get_index(df, column), includes, phrases, excludes, base, whole_words)
+    # Indeks per partisi; mask tiap partisi tinggal disambung sesuai urutan baris
+    return np.concatenate([
+        query_index(get_index(part, column), includes, phrases, excludes, None if base is None else base[start:stop], whole_words)
+        for start, stop, part in parts
+    ])
+
+
+def match_fields(fields, clauses, match, base):
+    # Klausa berscope menyaring kolomnya sendiri; klausa bebas cukup dipenuhi satu kolom.
+    # Kolom berikutnya (body) hanya diperiksa untuk baris yang belum cocok di kolom sebelumnya (title).
+    mask = base.copy()
+    for field in fields:
+        if any(clauses.get(field, ((), (), ()))):
+            mask = match(field, clauses[field], mask)
+    if not any(clauses[None]):
+        return mask
+    matched = np.zeros(len(mask), dtype=bool)
+    for field in fields:
+        remaining = mask & ~matched
+        if not remaining.any():
+            break
+        matched |= match(field, clauses[None], remaining)
+    return matched
+
+
+def query_mask(df, fields, query, base=None, whole_words=False):
+    base = np.ones(len(df), dtype=bool) if base is None else base
+    return match_fields(fields, parse_scoped_keywords(query, fields),
+                        lambda f, c, b: field_mask(df, f, *c, base=b, whole_words=whole_words), base)
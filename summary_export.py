@@ -0,0 +1,178 @@
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+try:
+    import xlsxwriter
+except ImportError:
+    xlsxwriter = None
+
+from ingest import fingerprint
+
+EXPORT_DIR = os.environ.get('NOLIMIT_EXPORT_DIR', os.path.join(tempfile.gettempdir(), 'nolimit-exports'))
+EXPORT_MAX_BYTES = int(os.environ.get('NOLIMIT_EXPORT_MAX_BYTES', 2 * 1024 ** 3))
+CHUNK_ROWS = 50_000
+XLSX_MAX_ROWS = 1_048_575
+XLSX_MAX_CHARS = 32_767
+
+FORMATS = {
+    'csv': {'ext': '.csv', 'mime': 'text/csv'},
+    'parquet': {'ext': '.parquet', 'mime': 'application/vnd.apache.parquet'},
+    'xlsx': {'ext': '.xlsx', 'mime': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'},
+}
+
+
+def available_formats():
+    return [fmt for fmt, module in (('csv', True), ('parquet', pq), ('xlsx', xlsxwriter)) if module is not None]
+
+
+def _plain(chunk):
+    # Kategori ditulis sebagai nilai aslinya supaya skema tiap potongan sama
+    return chunk.astype({col: object for col in chunk.columns if isinstance(chunk[col].dtype, pd.CategoricalDtype)})
+
+
+def _write_csv(path, columns, chunks):
+    with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+        pd.DataFrame(columns=columns).to_csv(f, index=False)
+        for chunk in chunks:
+            chunk.to_csv(f, header=False, index=False)
+
+
+def _parquet_schema(chunk):
+    # Skema dari dtype, bukan dari isi potongan pertama: kolom teks yang kosong semua tidak jadi tipe null
+    schema = pa.Schema.from_pandas(chunk.head(0), preserve_index=False)
+    for col in chunk.columns:
+        dtype = chunk[col].dtype
+        if isinstance(dtype, pd.CategoricalDtype) or pd.api.types.is_string_dtype(dtype):
+            schema = schema.set(schema.get_field_index(col), pa.field(col, pa.string()))
+    return schema
+
+
+def _write_parquet(path, columns, chunks):
+    writer = None
+    try:
+        for chunk in chunks:
+            if writer is None:
+                schema = _parquet_schema(chunk)
+                writer = pq.ParquetWriter(path, schema)
+            writer.write_table(pa.Table.from_pandas(_plain(chunk), schema=schema, preserve_index=False))
+        if writer is None:
+            pq.write_table(pa.table({col: pa.array([], pa.string()) for col in columns}), path)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def _write_xlsx(path, columns, chunks):
+    # constant_memory: baris langsung ditulis ke file sementara, tidak ditahan per sheet
+    workbook = xlsxwriter.Workbook(path, {'constant_memory': True, 'strings_to_urls': False})
+    try:
+        sheet = workbook.add_worksheet('Data')
+        sheet.write_row(0, 0, columns)
+        row = 1
+        for chunk in chunks:
+            values = _plain(chunk).to_numpy(dtype=object)
+            for record in values[:XLSX_MAX_ROWS - row + 1]:
+                sheet.write_row(row, 0, [
+                    None if v is None or v is pd.NA or (isinstance(v, float) and np.isnan(v))
+                    else v[:XLSX_MAX_CHARS] if isinstance(v, str) else v
+                    for v in record
+                ])
+                row += 1
+            if row > XLSX_MAX_ROWS:
+                break
+    finally:
+        workbook.close()
+
+
+WRITERS = {'csv': _write_csv, 'parquet': _write_parquet, 'xlsx': _write_xlsx}
+
+
+def export_key(df, mask, *state):
+    # Kunci cache: dataset, baris yang lolos filter dan parameter lain yang mengubah isi (cluster, isi, format)
+    mask_digest = hashlib.blake2b(np.packbits(mask).tobytes(), digest_size=16).hexdigest()
+    return (fingerprint(df), len(df), mask_digest) + state
+
+
+def export_path(key, fmt):
+    digest = hashlib.blake2b(repr(key).encode(), digest_size=20).hexdigest()
+    return os.path.join(EXPORT_DIR, f'{digest}{FORMATS[fmt]["ext"]}')
+
+
+def write_export(key, fmt, columns, chunks):
+    # chunks: fungsi tanpa argumen yang menghasilkan potongan DataFrame; tidak dipanggil kalau file sudah ada
+    path = export_path(key, fmt)
+    try:
+        os.utime(path)
+        return path
+    except FileNotFoundError:
+        pass
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=EXPORT_DIR, suffix='.tmp')
+    os.close(fd)
+    try:
+        WRITERS[fmt](tmp_path, list(columns), chunks())
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    evict(keep=path)
+    return path
+
+
+def open_export(key, fmt, columns, chunks):
+    # Yang dikembalikan handle file, bukan isinya; pemanggil (st.download_button) yang membaca lalu menutupnya
+    return open(write_export(key, fmt, columns, chunks), 'rb')
+
+
+def evict(max_bytes=None, keep=None):
+    max_bytes = EXPORT_MAX_BYTES if max_bytes is None else max_bytes
+    if not os.path.isdir(EXPORT_DIR):
+        return []
+    entries = []
+    for name in os.listdir(EXPORT_DIR):
+        path = os.path.join(EXPORT_DIR, name)
+        if not name.endswith('.tmp'):
+            # Sesi lain bisa membuang file yang sama di antara listdir dan stat/remove
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, name))
+    entries.sort()
+    total = sum(size for _, size, _ in entries)
+    removed = []
+    for _, size, name in entries:
+        if total <= max_bytes:
+            break
+        if os.path.join(EXPORT_DIR, name) == keep:
+            continue
+        try:
+            os.remove(os.path.join(EXPORT_DIR, name))
+        except FileNotFoundError:
+            continue
+        total -= size
+        removed.append(name)
+    return removed
+
+
+def frame_chunks(frame, chunk_rows=CHUNK_ROWS):
+    for start in range(0, len(frame), chunk_rows):
+        yield frame.iloc[start:start + chunk_rows]
+
+
+def row_chunks(df, mask, columns, chunk_rows=CHUNK_ROWS):
+    # Baris yang lolos filter diambil per potongan posisi, tanpa membuat salinan df.loc[mask] utuh
+    rows = np.flatnonzero(mask)
+    for start in range(0, len(rows), chunk_rows):
+        yield df.iloc[rows[start:start + chunk_rows]][columns]
@@ -0,0 +1,99 @@
+import math
+
+import pandas as pd
+import streamlit as st
+
+from dataset_registry import REGISTRY_MAX_BYTES, registry_stats, release
+from ingest_jobs import cancel_ingest, job_progress
+from summary_export import FORMATS, available_formats, open_export
+
+PAGE_SIZES = [25, 50, 100, 250]
+
+
+def paginate(summary, sort_by='Article', ascending=False, page=1, page_size=50, top_n=0):
+    if top_n:
+        # Ringkasan dari engine sudah urut Article menurun
+        summary = summary.head(top_n)
+    if (sort_by, ascending) != ('Article', False):
+        summary = summary.sort_values(sort_by, ascending=ascending, kind='stable')
+    pages = max(1, math.ceil(len(summary) / page_size))
+    page = min(max(page, 1), pages)
+    start = (page - 1) * page_size
+    return summary.iloc[start:start + page_size], page, pages
+
+
+def summary_page(summary, text_col, sort_options=None):
+    col_sort, col_order, col_size, col_top = st.columns(4)
+    sort_by = col_sort.selectbox("Urutkan", sort_options or ['Article', text_col, 'Sentiment'], key='table_sort_by')
+    ascending = col_order.selectbox("Arah", ["Menurun", "Menaik"], key='table_order') == "Menaik"
+    page_size = col_size.selectbox("Baris per halaman", PAGE_SIZES, index=1, key='table_page_size')
+    top_n = col_top.number_input("Top N topik (0 = semua)", min_value=0, value=0, step=10, key='table_top_n')
+
+    n_topics = min(len(summary), top_n) if top_n else len(summary)
+    pages = max(1, math.ceil(n_topics / page_size))
+    if st.session_state.get('table_page', 1) > pages:
+        st.session_state['table_page'] = pages
+    page = st.number_input("Halaman", min_value=1, max_value=pages, key='table_page')
+    st.caption(f"Halaman {page} dari {pages} · {n_topics} topik")
+    return paginate(summary, sort_by, ascending, page, page_size, top_n)[0]
+
+
+def download_panel(key, sources):
+    # sources: {isi: (label, kolom, fungsi penghasil potongan)}; file dibuat saat tombol diklik lalu di-cache di disk
+    with st.expander("⬇️ Unduh hasil"):
+        col_content, col_format = st.columns(2)
+        content = col_content.radio("Isi", list(sources), format_func=lambda c: sources[c][0], horizontal=True, key='export_content')
+        fmt = col_format.selectbox("Format", available_formats(), format_func=str.upper, key='export_format',
+                                   help="XLSX dibatasi 1.048.575 baris dan 32.767 karakter per sel")
+        _, columns, chunks = sources[content]
+        st.download_button("⬇️ Unduh", data=lambda: open_export(key + (content,), fmt, columns, chunks),
+                           file_name=f"nolimit-{content}{FORMATS[fmt]['ext']}", mime=FORMATS[fmt]['mime'],
+                           on_click='ignore', key='export_download')
+
+
+def performance_panel(report):
+    if not report:
+        return
+    stages = pd.DataFrame({
+        'Tahap': ['· ' * r['depth'] + r['stage'] for r in report['stages']],
+        'Detik': [r['seconds'] for r in report['stages']],
+        'Baris masuk': pd.array([r.get('rows_in') for r in report['stages']], dtype='Int64'),
+        'Baris keluar': pd.array([r.get('rows_out') for r in report['stages']], dtype='Int64'),
+        'Δ RSS (MB)': [r.get('rss_mb') for r in report['stages']],
+        'Puncak RSS +MB': [r.get('peak_mb') for r in report['stages']],
+        'Cache': [r.get('cache', '') for r in report['stages']],
+    })
+    with st.sidebar.expander("⏱️ Performance", expanded=True):
+        st.caption(f"Total rerun {report['seconds']:.3f} s · {len(report['stages'])} tahap · memori diukur per proses (semua sesi)")
+        st.dataframe(stages, hide_index=True, use_container_width=True)
+
+
+def registry_panel():
+    stats = registry_stats()
+    with st.sidebar.expander("🗄️ Dataset bersama"):
+        used = stats['MB'].sum() + stats['Artefak MB'].sum()
+        st.caption(f"{len(stats)} dataset · {used:.1f} / {REGISTRY_MAX_BYTES / 1024 ** 2:.0f} MB (frame + artefak)")
+        st.dataframe(stats, hide_index=True, use_container_width=True)
+
+
+def ingest_status(job):
+    progress = job_progress(job)
+    if st.session_state.get('ingest_cancelled') == job['digest']:
+        # Job bisa tetap jalan untuk sesi lain yang membuka ZIP yang sama
+        progress = {**progress, 'status': 'cancelled'}
+    if progress['status'] == 'running':
+        col_bar, col_cancel = st.columns([0.85, 0.15])
+        col_bar.progress(progress['parsed'] / max(progress['members'], 1),
+                         text=f"📦 {progress['parsed']}/{progress['members']} file CSV terbaca · {progress['rows']} baris")
+        if col_cancel.button("⏹️ Batalkan", key='ingest_cancel'):
+            cancel_ingest(job['digest'])
+            release()
+            st.session_state['ingest_cancelled'] = job['digest']
+            st.rerun()
+    elif progress['status'] == 'cancelled':
+        st.info("⏹️ Pembacaan ZIP dibatalkan.")
+    elif progress['status'] == 'evicted':
+        st.info("🗄️ Dataset sudah dikeluarkan dari memori server. Muat ulang ZIP untuk membacanya lagi.")
+    elif progress['status'] == 'error':
+        st.error(f"❌ Gagal membaca ZIP: {progress['error']}")
+    return progress
@@ -0,0 +1,169 @@
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import downloader
+from downloader import _spool_paths, _write_meta, download_zip, evict
+
+PAYLOAD = bytes(range(256)) * 4096
+
+
+class ZipHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        state = self.server.state
+        state['requests'].append(dict(self.headers))
+        body, etag = state['body'], state['etag']
+        if self.headers.get('If-None-Match') == etag:
+            state['responses'].append(304)
+            self.send_response(304)
+            self.end_headers()
+            return
+        start = 0
+        match = re.match(r'bytes=(\d+)-', self.headers.get('Range', ''))
+        if match and self.headers.get('If-Range') in (None, etag):
+            start = int(match.group(1))
+            if start >= len(body):
+                state['responses'].append(416)
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{len(body)}')
+                self.end_headers()
+                return
+        status = 206 if start else 200
+        state['responses'].append(status)
+        self.send_response(status)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(body) - start))
+        if start:
+            self.send_header('Content-Range', f'bytes {start}-{len(body) - 1}/{len(body)}')
+        self.end_headers()
+        time.sleep(state['delay'])
+        # cut_at: putuskan koneksi setelah sekian byte untuk mensimulasikan unduhan terputus
+        end = len(body) if state['cut_at'] is None else state['cut_at']
+        self.wfile.write(body[start:end])
+        state['cut_at'] = None
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), ZipHandler)
+    httpd.state = {'body': PAYLOAD, 'etag': '"v1"', 'cut_at': None, 'delay': 0, 'requests': [], 'responses': []}
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{httpd.server_address[1]}/export.zip', httpd.state
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def test_download_then_revalidate_with_304(server, tmp_path):
+    url, state = server
+    path = download_zip(url, download_dir=str(tmp_path))
+    assert _read(path) == PAYLOAD
+    mtime = os.path.getmtime(path)
+
+    assert download_zip(url, download_dir=str(tmp_path)) == path
+    assert state['responses'] == [200, 304]
+    assert state['requests'][1]['If-None-Match'] == '"v1"'
+    assert _read(path) == PAYLOAD
+    assert os.path.getmtime(path) >= mtime
+
+
+def test_resume_interrupted_download_with_if_range(server, tmp_path):
+    url, state = server
+    state['cut_at'] = 100_000
+    progress = []
+    with pytest.raises(Exception):
+        download_zip(url, download_dir=str(tmp_path))
+    _, part_path, _ = _spool_paths(url, str(tmp_path))
+    assert os.path.getsize(part_path) == 100_000
+
+    path = download_zip(url, progress=lambda done, total: progress.append((done, total)), download_dir=str(tmp_path))
+    assert _read(path) == PAYLOAD
+    assert state['responses'] == [200, 206]
+    assert state['requests'][1]['Range'] == 'bytes=100000-'
+    assert state['requests'][1]['If-Range'] == '"v1"'
+    assert progress[-1] == (len(PAYLOAD), len(PAYLOAD))
+    assert not os.path.exists(part_path)
+
+
+def test_changed_file_is_downloaded_again_instead_of_resumed(server, tmp_path):
+    url, state = server
+    state['cut_at'] = 100_000
+    with pytest.raises(Exception):
+        download_zip(url, download_dir=str(tmp_path))
+    state.update(body=PAYLOAD[::-1], etag='"v2"')
+
+    path = download_zip(url, download_dir=str(tmp_path))
+    assert state['responses'] == [200, 200]
+    assert _read(path) == PAYLOAD[::-1]
+
+
+def test_unsatisfiable_range_restarts_from_scratch(server, tmp_path):
+    url, state = server
+    _, part_path, meta_path = _spool_paths(url, str(tmp_path))
+    with open(part_path, 'wb') as f:
+        f.write(b'x' * (len(PAYLOAD) + 10))
+    _write_meta(meta_path, {'url': url, 'complete': False, 'etag': '"v1"', 'last_modified': None})
+
+    path = download_zip(url, download_dir=str(tmp_path))
+    assert state['responses'] == [416, 200]
+    assert _read(path) == PAYLOAD
+
+
+def test_concurrent_requests_share_one_download(server, tmp_path):
+    url, state = server
+    state['delay'] = 0.5
+    results = [None] * 4
+
+    def fetch(i):
+        results[i] = download_zip(url, download_dir=str(tmp_path))
+
+    threads = [threading.Thread(target=fetch, args=(i,)) for i in range(len(results))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(state['requests']) == 1
+    assert len(set(results)) == 1
+    assert _read(results[0]) == PAYLOAD
+
+
+def _age(url, download_dir, seconds):
+    for path in _spool_paths(url, download_dir):
+        if os.path.exists(path):
+            os.utime(path, (time.time() - seconds, time.time() - seconds))
+
+
+def test_completed_download_evicts_oldest_spools(server, tmp_path, monkeypatch):
+    url, state = server
+    old = download_zip(url + '?v=1', download_dir=str(tmp_path))
+    _age(url + '?v=1', str(tmp_path), 60)
+    monkeypatch.setattr(downloader, 'DOWNLOAD_MAX_BYTES', len(PAYLOAD) + 1024)
+
+    new = download_zip(url + '?v=2', download_dir=str(tmp_path))
+    assert not any(os.path.exists(p) for p in _spool_paths(url + '?v=1', str(tmp_path)))
+    assert old != new and _read(new) == PAYLOAD
+
+
+def test_evict_skips_downloads_in_flight(server, tmp_path, monkeypatch):
+    url, state = server
+    download_zip(url, download_dir=str(tmp_path))
+    _, part_path, _ = _spool_paths(url + '?busy', str(tmp_path))
+    with open(part_path, 'wb') as f:
+        f.write(b'x' * 1000)
+    _age(url + '?busy', str(tmp_path), 60)
+    monkeypatch.setitem(downloader._inflight, (url + '?busy', str(tmp_path)), None)
+
+    evict(0, str(tmp_path))
+    assert os.listdir(tmp_path) == [os.path.basename(part_path)]
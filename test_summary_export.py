@@ -0,0 +1,37 @@
+import pandas as pd
+import pytest
+
+import summary_export
+from summary_export import available_formats, write_export
+
+pq = pytest.importorskip('pyarrow.parquet')
+
+
+@pytest.fixture(autouse=True)
+def export_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(summary_export, 'EXPORT_DIR', str(tmp_path))
+
+
+def _chunks(df, chunk_rows):
+    return lambda: (df.iloc[start:start + chunk_rows] for start in range(0, len(df), chunk_rows))
+
+
+def test_parquet_schema_does_not_come_from_all_null_first_chunk():
+    # Tier tak dikenal dinormalisasi jadi NaN; potongan pertama yang kosong semua tidak boleh mengunci tipe null
+    tiers = pd.Categorical([None, None, 'Tier 1', 'Tier 2'], categories=['Tier 1', 'Tier 2', 'Tier 3'], ordered=True)
+    df = pd.DataFrame({'title': ['a', 'b', 'c', 'd'], 'tier': tiers, 'Article': [4, 3, 2, 1]})
+    path = write_export(('tier-nan',), 'parquet', df.columns, _chunks(df, 2))
+    table = pq.read_table(path)
+    assert str(table.schema.field('tier').type) == 'string'
+    assert table.column('tier').to_pylist() == [None, None, 'Tier 1', 'Tier 2']
+    assert table.column('Article').to_pylist() == [4, 3, 2, 1]
+
+
+@pytest.mark.parametrize('fmt', available_formats())
+def test_every_format_writes_all_chunks(fmt):
+    df = pd.DataFrame({'title': [f't{i}' for i in range(5)], 'url': [None, 'u1', None, 'u3', 'u4']})
+    path = write_export(('rows', fmt), fmt, df.columns, _chunks(df, 2))
+    if fmt == 'parquet':
+        assert pq.read_table(path).num_rows == 5
+    elif fmt == 'csv':
+        assert len(pd.read_csv(path)) == 5
@@ -0,0 +1,46 @@
+import pandas as pd
+
+TIER_ORDER = ['Tier 1', 'Tier 2', 'Tier 3', '-', '']
+TIER_COLUMNS = ['Tier 1', 'Tier 2', 'Tier 3']
+
+
+def tier_categorical(values, categories, ordered=False):
+    # Tier di luar daftar jadi NaN; pandas tidak lagi menerima nilai asing saat Categorical dibuat dengan kategori
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.set_categories(categories, ordered=ordered).array
+    return pd.Categorical(values.where(values.isin(categories)), categories=categories, ordered=ordered)
+
+
+def modal_value(frame, key, column):
+    # Sama dengan Series.mode().iloc[0]: frekuensi terbanyak, seri dipecah dengan nilai terkecil
+    counts = frame.groupby([key, column], sort=False, observed=True).size().reset_index(name='n')
+    counts = counts.sort_values([key, 'n', column], ascending=[True, False, True], kind='stable')
+    return counts.drop_duplicates(key).set_index(key)[column]
+
+
+def best_link(frame, key, tier_col, url_col):
+    # URL pertama dari tier terbaik per topik, dalam urutan baris asli
+    rank = tier_categorical(frame[tier_col], TIER_ORDER).codes
+    ranked = frame.loc[rank >= 0, [key, url_col]].assign(_rank=rank[rank >= 0])
+    ranked = ranked.sort_values('_rank', kind='stable').drop_duplicates(key)
+    return ranked.set_index(key)[url_col]
+
+
+def tier_breakdown(frame, key, tier_col):
+    tiers = tier_categorical(frame[tier_col], TIER_COLUMNS)
+    counts = frame[[key]].assign(_tier=tiers).groupby([key, '_tier'], observed=False).size()
+    return counts.unstack('_tier', fill_value=0).rename_axis(columns=None)
+
+
+def summarize_topics(df, key, sentiment_col, url_col='url', tier_col=None):
+    frame = df[[c for c in (key, sentiment_col, url_col, tier_col) if c]]
+    groups = frame.groupby(key, sort=True, observed=True)
+    summary = groups.size().rename('Article').to_frame()
+    summary['Sentiment'] = modal_value(frame, key, sentiment_col).reindex(summary.index).astype(object).fillna('-')
+    if tier_col:
+        summary['Link'] = best_link(frame, key, tier_col, url_col).reindex(summary.index).astype(object).fillna('-')
+        breakdown = tier_breakdown(frame, key, tier_col)
+        summary = summary.join(breakdown.reindex(index=summary.index, columns=TIER_COLUMNS, fill_value=0))
+    else:
+        summary['Link'] = groups[url_col].first().reindex(summary.index).astype(object).fillna('-')
+    return summary.reset_index().sort_values(by='Article', ascending=False)
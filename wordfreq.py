@@ -0,0 +1,171 @@
+import functools
+import os
+
+import numpy as np
+import pandas as pd
+
+from ingest import dataset_artifact, partition_frames
+from search import token_codes
+
+STOPWORDS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'stopwords-id.txt')
+MIN_WORD_LENGTH = 3
+TOP_TERMS = 500
+
+
+@functools.lru_cache(maxsize=1)
+def load_stopwords():
+    # Daftar stopwords-iso (id) disimpan di repo supaya jalan di server tanpa internet
+    with open(STOPWORDS_PATH, encoding='utf-8') as f:
+        return frozenset(line.strip() for line in f if line.strip())
+
+
+def _count_matrix(rows, terms, n_rows, n_terms):
+    # Matriks dokumen-term jarang (COO terurut per baris): satu entri per (baris, term) beserta jumlahnya
+    keys = rows.astype(np.int64)
+    keys *= n_terms
+    keys += terms
+    keys.sort()
+    # Awal tiap grup kunci yang sama; tanpa token sama sekali tidak ada grup
+    starts = np.flatnonzero(np.append(keys.size > 0, keys[1:] != keys[:-1]))
+    counts = np.diff(np.append(starts, len(keys)))
+    keys = keys[starts]
+    return {
+        'rows': (keys // n_terms).astype(np.int32),
+        'terms': (keys % n_terms).astype(np.int32),
+        'counts': counts.astype(np.int32),
+        'n_rows': n_rows,
+        'n_terms': n_terms,
+    }
+
+
+def build_term_matrix(texts, sentiments=None):
+    # Semua token \w+ huruf kecil sebagai kode integer per potongan baris, bukan satu string Python per token.
+    # Kata pendek (< MIN_WORD_LENGTH) tidak dihitung tapi tetap ada di urutan token supaya memutus bigram seperti stopword.
+    rows, words, token_vocab = token_codes(texts)
+    # Cek stopword/kata pendek sekali per kata unik
+    stopwords = load_stopwords()
+    is_stop = np.fromiter((len(word) < MIN_WORD_LENGTH or word in stopwords for word in token_vocab),
+                          dtype=bool, count=len(token_vocab))[words]
+
+    codes, uniques = pd.factorize(words[~is_stop])
+    vocab = token_vocab[uniques]
+    unigrams = _count_matrix(rows[~is_stop], codes, len(texts), len(vocab))
+
+    # Bigram: dua token berurutan di baris yang sama dan keduanya bukan stopword/kata pendek; teks frasa hanya dibuat per pasangan unik
+    pair = (rows[1:] == rows[:-1]) & ~is_stop[1:] & ~is_stop[:-1]
+    phrase_codes, phrase_keys = pd.factorize(words[:-1][pair].astype(np.int64) * len(token_vocab) + words[1:][pair])
+    phrase_vocab = token_vocab[phrase_keys // len(token_vocab)] + ' ' + token_vocab[phrase_keys % len(token_vocab)]
+    bigrams = _count_matrix(rows[:-1][pair], phrase_codes, len(texts), len(phrase_vocab))
+
+    matrix = {
+        'vocab': np.asarray(vocab, dtype=object),
+        'unigrams': unigrams,
+        'bigram_vocab': np.asarray(phrase_vocab, dtype=object),
+        'bigrams': bigrams,
+    }
+    if sentiments is not None:
+        # Faktorkan nilai asli (kategori langsung dari kodenya) lalu gabungkan yang sama setelah lowercase
+        raw_codes, raw_vocab = pd.factorize(sentiments.reset_index(drop=True), use_na_sentinel=False)
+        lowered = pd.Series(np.asarray(raw_vocab, dtype=object)).fillna('').astype(str).str.lower()
+        sentiment_codes, sentiment_vocab = pd.factorize(lowered)
+        matrix['sentiment_codes'] = sentiment_codes[raw_codes]
+        matrix['sentiment_vocab'] = list(sentiment_vocab)
+    return matrix
+
+
+def _merge_counts(matrices, key, vocab_key, n_rows):
+    # Kode term tiap partisi dipetakan ke kosakata gabungan; baris digeser sesuai posisi partisi
+    codes, vocab = pd.factorize(np.concatenate([m[vocab_key] for m in matrices]))
+    rows, terms, counts = [], [], []
+    row_offset = term_offset = 0
+    for m in matrices:
+        part = m[key]
+        rows.append(part['rows'] + row_offset)
+        terms.append(codes[term_offset:term_offset + part['n_terms']][part['terms']])
+        counts.append(part['counts'])
+        row_offset += part['n_rows']
+        term_offset += part['n_terms']
+    merged = {
+        'rows': np.concatenate(rows).astype(np.int32),
+        'terms': np.concatenate(terms).astype(np.int32),
+        'counts': np.concatenate(counts),
+        'n_rows': n_rows,
+        'n_terms': len(vocab),
+    }
+    return merged, np.asarray(vocab, dtype=object)
+
+
+def merge_term_matrices(matrices):
+    n_rows = sum(m['unigrams']['n_rows'] for m in matrices)
+    unigrams, vocab = _merge_counts(matrices, 'unigrams', 'vocab', n_rows)
+    bigrams, bigram_vocab = _merge_counts(matrices, 'bigrams', 'bigram_vocab', n_rows)
+    merged = {'vocab': vocab, 'unigrams': unigrams, 'bigram_vocab': bigram_vocab, 'bigrams': bigrams}
+    if all('sentiment_codes' in m for m in matrices):
+        codes, sentiment_vocab = pd.factorize(np.concatenate([np.asarray(m['sentiment_vocab'], dtype=object) for m in matrices]))
+        offsets = np.cumsum([0] + [len(m['sentiment_vocab']) for m in matrices])
+        merged['sentiment_codes'] = np.concatenate([
+            codes[start:stop][m['sentiment_codes']] for m, start, stop in zip(matrices, offsets[:-1], offsets[1:])
+        ])
+        merged['sentiment_vocab'] = list(sentiment_vocab)
+    return merged
+
+
+def get_term_matrix(df, text_columns, sentiment_col=None):
+    def build(d):
+        texts = d[text_columns[0]].fillna('').astype(str)
+        for column in text_columns[1:]:
+            texts = texts + ' ' + d[column].fillna('').astype(str)
+        return build_term_matrix(texts, d[sentiment_col] if sentiment_col else None)
+    name = f"term_matrix:{','.join(text_columns)}"
+    parts = partition_frames(df)
+    if len(parts) > 1:
+        # Matriks per partisi di-cache sendiri; gabungannya murah karena tidak perlu tokenisasi ulang
+        return dataset_artifact(df, name, lambda d: merge_term_matrices([get_term_matrix(part, text_columns, sentiment_col) for _, _, part in parts]))
+    return dataset_artifact(df, name, build)
+
+
+def _totals(counts_matrix, mask):
+    rows, terms, counts = counts_matrix['rows'], counts_matrix['terms'], counts_matrix['counts']
+    if mask is not None:
+        selected = mask[rows]
+        terms, counts = terms[selected], counts[selected]
+    return np.bincount(terms, weights=counts, minlength=counts_matrix['n_terms']).astype(np.int64)
+
+
+def _top_k(totals, vocab, k, columns):
+    nonzero = np.flatnonzero(totals)
+    if len(nonzero) > k:
+        # argpartition dulu baru urutkan k teratas; seri diurutkan sesuai kemunculan pertama
+        nonzero = nonzero[np.argpartition(-totals[nonzero], k - 1)[:k]]
+        threshold = totals[nonzero].min()
+        nonzero = np.flatnonzero(totals >= threshold)
+    order = np.lexsort((nonzero, -totals[nonzero]))[:k]
+    top = nonzero[order]
+    return pd.DataFrame({columns[0]: vocab[top], columns[1]: totals[top]})
+
+
+def top_terms(matrix, mask=None, k=TOP_TERMS):
+    return _top_k(_totals(matrix['unigrams'], mask), matrix['vocab'], k, ['Kata', 'Jumlah'])
+
+
+def top_bigrams(matrix, mask=None, k=TOP_TERMS):
+    return _top_k(_totals(matrix['bigrams'], mask), matrix['bigram_vocab'], k, ['Frasa', 'Jumlah'])
+
+
+def terms_by_sentiment(matrix, mask=None, k=TOP_TERMS):
+    unigrams = matrix['unigrams']
+    n_terms = unigrams['n_terms']
+    sentiment_codes = matrix['sentiment_codes'][unigrams['rows']]
+    terms, counts = unigrams['terms'], unigrams['counts']
+    if mask is not None:
+        selected = mask[unigrams['rows']]
+        sentiment_codes, terms, counts = sentiment_codes[selected], terms[selected], counts[selected]
+    n_sentiments = len(matrix['sentiment_vocab'])
+    per_sentiment = np.bincount(
+        sentiment_codes.astype(np.int64) * n_terms + terms, weights=counts, minlength=n_sentiments * n_terms,
+    ).reshape(n_sentiments, n_terms).astype(np.int64)
+    totals = per_sentiment.sum(axis=0)
+    top = _top_k(totals, np.arange(n_terms), k, ['term', 'Jumlah'])['term'].to_numpy()
+    table = pd.DataFrame(per_sentiment[:, top].T, columns=matrix['sentiment_vocab'])
+    table.insert(0, 'Kata', matrix['vocab'][top])
+    return table